@@ -0,0 +1,17 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from core import testing
+
+
+class AboutQueryBudgetTests(testing.QueryBudgetMixin, TestCase):
+    def requests(self) -> dict:
+        client = self.client_for(self.most_active_user())
+        return {
+            'author': (0, lambda: self.client.get(reverse('about:author'))),
+            'tech': (0, lambda: self.client.get(reverse('about:tech'))),
+            'author_signed_in': (
+                2,
+                lambda: client.get(reverse('about:author')),
+            ),
+        }
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):  # noqa: PLR6301
+        from . import instrumentation  # noqa: F401
@@ -0,0 +1,273 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+"""
+
+# Least recently used entries go first, until both the number of entries
+# and their total size are back under the limits
+CULL = """
+DELETE FROM cache WHERE key IN (
+    SELECT key FROM (
+        SELECT
+            key,
+            ROW_NUMBER() OVER lru AS position,
+            SUM(size) OVER lru - size AS freed_before
+        FROM cache
+        WINDOW lru AS (ORDER BY accessed ROWS UNBOUNDED PRECEDING)
+    )
+    WHERE position <= ? OR freed_before < ?
+)
+"""
+
+UPSERT = """
+INSERT INTO cache (key, value, size, expires, accessed)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    size = excluded.size,
+    expires = excluded.expires,
+    accessed = excluded.accessed
+"""
+
+# Keeps the number of bound parameters well under SQLite's limit
+CHUNK_SIZE = 500
+
+
+def _chunks(items) -> list:
+    items = list(items)
+    return [
+        items[i : i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)
+    ]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+    Не требует внешних сервисов. Старые записи вытесняются по давности
+    последнего чтения (LRU), когда превышено число записей `MAX_ENTRIES`
+    или их суммарный размер в байтах `MAX_SIZE`.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    # Hits refresh the LRU timestamp at most this often, in seconds,
+    # so hot keys don't turn every read into a write
+    access_resolution = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = Path(location)
+        self._max_size = int(options.get('MAX_SIZE', 0))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Every thread has its own connection, or the transactions of
+        # concurrent writers would interleave on it; a connection must not
+        # be shared with a forked worker either
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            local.db = sqlite3.connect(
+                self._path, timeout=self._busy_timeout, isolation_level=None
+            )
+            local.db.execute('PRAGMA journal_mode = WAL')
+            local.db.execute('PRAGMA synchronous = NORMAL')
+            local.db.executescript(SCHEMA)
+            local.pid = os.getpid()
+        return local.db
+
+    @contextmanager
+    def _write(self):
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _row(self, key, value, expires, now) -> tuple:
+        blob = pickle.dumps(value, self.pickle_protocol)
+        return key, blob, len(blob), expires, now
+
+    def _cull(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count, size = db.execute(
+            'SELECT COUNT(*), TOTAL(size) FROM cache'
+        ).fetchone()
+        excess_entries = excess_bytes = 0
+        if count > self._max_entries:
+            excess_entries = (
+                count - self._max_entries + self._headroom(self._max_entries)
+            )
+        if self._max_size and size > self._max_size:
+            excess_bytes = (
+                size - self._max_size + self._headroom(self._max_size)
+            )
+        if excess_entries or excess_bytes:
+            db.execute(CULL, (excess_entries, excess_bytes))
+
+    def _headroom(self, limit: int) -> int:
+        """Сколько освободить сверх лимита, чтобы не чистить на каждой записи."""
+        if self._cull_frequency == 0:
+            return limit
+        return limit // self._cull_frequency
+
+    def _get_many(self, keys) -> dict:
+        now = time.time()
+        found, stale = {}, []
+        for chunk in _chunks(keys):
+            rows = self.db.execute(
+                'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))}) '
+                'AND (expires IS NULL OR expires > ?)',
+                (*chunk, now),
+            )
+            for key, value, accessed in rows:
+                found[key] = pickle.loads(value)
+                if accessed < now - self.access_resolution:
+                    stale.append(key)
+        for chunk in _chunks(stale):
+            self.db.execute(
+                'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                (now, *chunk),
+            )
+        return found
+
+    def _set_many(self, data: dict, timeout) -> None:
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        if expires is not None and expires <= now:
+            # A zero timeout means "don't cache", e.g. {% cache 0 %}
+            for chunk in _chunks(data):
+                self.db.execute(
+                    'DELETE FROM cache '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                    chunk,
+                )
+            return
+        with self._write() as db:
+            db.executemany(
+                UPSERT,
+                (
+                    self._row(key, value, expires, now)
+                    for key, value in data.items()
+                ),
+            )
+            self._cull(db, now)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {
+            self.make_and_validate_key(key, version=version): key
+            for key in keys
+        }
+        return {
+            keys[key]: value for key, value in self._get_many(keys).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._set_many({key: value}, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_many(
+            {
+                self.make_and_validate_key(key, version=version): value
+                for key, value in data.items()
+            },
+            timeout,
+        )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        with self._write() as db:
+            added = db.execute(
+                f'{UPSERT} WHERE cache.expires <= ?',
+                (*self._row(key, value, expires, now), now),
+            ).rowcount
+            if added:
+                self._cull(db, now)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return bool(
+            self.db.execute(
+                'UPDATE cache SET expires = ?, accessed = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now),
+            ).rowcount
+        )
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                msg = f"Key '{key}' not found"
+                raise ValueError(msg)
+            value = pickle.loads(row[0]) + delta
+            db.execute(UPSERT, self._row(key, value, row[1], now))
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return (
+            self.db.execute(
+                'SELECT 1 FROM cache '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            is not None
+        )
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(
+            self.db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount
+        )
+
+    def delete_many(self, keys, version=None):
+        keys = [
+            self.make_and_validate_key(key, version=version) for key in keys
+        ]
+        for chunk in _chunks(keys):
+            self.db.execute(
+                f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
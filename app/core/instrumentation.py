@@ -0,0 +1,218 @@
+# ruff: noqa: ARG001, ARG002, PLR6301
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends import django as django_backend
+from django.template.backends.django import reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('total_ms', 'db_ms', 'queries', 'template_ms')
+
+_connects = ContextVar('db_connects', default=None)
+_current = ContextVar('request_metrics', default=None)
+_samples = {}
+_samples_lock = threading.Lock()
+
+
+def connection_opened(alias: str, seconds: float, *, reused: bool) -> None:
+    """Записать открытие соединения с базой в текущем запросе."""
+    opened = _connects.get()
+    if opened is not None:
+        opened.append((alias, seconds, reused))
+
+
+def add_server_timing(response, entry: str) -> None:
+    if response.has_header('Server-Timing'):
+        entry = f'{response["Server-Timing"]}, {entry}'
+    response['Server-Timing'] = entry
+
+
+class ConnectionTimingMiddleware(HybridMiddleware):
+    """Сообщить, сколько запрос потратил на открытие соединений с базой.
+
+    Время уходит в заголовок `Server-Timing` (его видно во вкладке
+    Network браузера) и в лог `core.instrumentation`.
+    """
+
+    @contextmanager
+    def around(self, request):
+        opened = []
+        token = _connects.set(opened)
+        try:
+            yield opened
+        finally:
+            _connects.reset(token)
+
+    def finish(self, request, response, opened):
+        if opened:
+            total = sum(seconds for _, seconds, _ in opened) * 1000
+            fresh = sum(not reused for _, _, reused in opened)
+            add_server_timing(
+                response,
+                f'db-connect;dur={total:.2f};desc="{len(opened)} opened, '
+                f'{fresh} new"',
+            )
+            logger.debug(
+                '%s %s: %d соединений с базой (%d новых), %.2f ms',
+                request.method,
+                request.path,
+                len(opened),
+                fresh,
+                total,
+            )
+        return response
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs) -> None:
+    """Считать запросы соединения в метрики запроса, который их делает.
+
+    Обёртка ставится один раз на соединение, а не на каждый запрос:
+    под ASGI запросы к базе идут из другого потока, чем middleware.
+    """
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics['db_ms'] += (time.perf_counter() - start) * 1000
+        metrics['queries'] += 1
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Included and nested renders are part of the outermost one
+        if metrics is None or metrics['rendering']:
+            return super().render(context, request)
+        metrics['rendering'] = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics['template_ms'] += (time.perf_counter() - start) * 1000
+            metrics['rendering'] = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблоны Django, которые сообщают время отрисовки в метрики запроса."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """Замерить запросы к view из `REQUEST_METRICS_NAMESPACES`.
+
+    Для каждого запроса считаются число SQL-запросов, время в базе,
+    время отрисовки шаблонов и полное время ответа. Последние
+    `REQUEST_METRICS_SAMPLES` замеров каждого view хранятся в памяти
+    процесса, запросы сверх `REQUEST_BUDGETS` пишутся в лог.
+    """
+
+    @contextmanager
+    def around(self, request):
+        metrics = {
+            'queries': 0,
+            'db_ms': 0.0,
+            'template_ms': 0.0,
+            'rendering': False,
+        }
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            _current.reset(token)
+            metrics['total_ms'] = (time.perf_counter() - start) * 1000
+
+    def finish(self, request, response, metrics):
+        match = request.resolver_match
+        if match and match.namespace in settings.REQUEST_METRICS_NAMESPACES:
+            record(match.view_name, metrics)
+            check_budgets(request, match.view_name, metrics)
+            add_server_timing(
+                response,
+                f'db;dur={metrics["db_ms"]:.2f};desc="{metrics["queries"]} '
+                f'queries", tpl;dur={metrics["template_ms"]:.2f}, '
+                f'total;dur={metrics["total_ms"]:.2f}',
+            )
+        return response
+
+
+def record(view_name: str, metrics: dict) -> None:
+    samples = _samples.get(view_name)
+    if samples is None:
+        with _samples_lock:
+            samples = _samples.setdefault(
+                view_name, deque(maxlen=settings.REQUEST_METRICS_SAMPLES)
+            )
+    samples.append(tuple(metrics[name] for name in METRICS))
+
+
+def check_budgets(request, view_name: str, metrics: dict) -> None:
+    over = [
+        f'{name} {metrics[name]:.0f} > {limit}'
+        for name, limit in settings.REQUEST_BUDGETS.items()
+        if metrics[name] > limit
+    ]
+    if over:
+        logger.warning(
+            '%s %s (%s) вышел за бюджет: %s',
+            request.method,
+            request.get_full_path(),
+            view_name,
+            ', '.join(over),
+        )
+
+
+def percentile(values: list, fraction: float):
+    return values[round(fraction * (len(values) - 1))]
+
+
+def summary() -> dict:
+    """Перцентили метрик каждого view по замерам этого процесса."""
+    with _samples_lock:
+        views = {name: list(samples) for name, samples in _samples.items()}
+    result = {}
+    for name, samples in sorted(views.items()):
+        result[name] = {'count': len(samples)}
+        for index, metric in enumerate(METRICS):
+            values = sorted(sample[index] for sample in samples)
+            result[name][metric] = {
+                f'p{round(fraction * 100)}': round(
+                    percentile(values, fraction), 2
+                )
+                for fraction in (0.5, 0.95, 0.99)
+            }
+    return result
+
+
+def reset() -> None:
+    with _samples_lock:
+        _samples.clear()
@@ -0,0 +1,122 @@
+# ruff: noqa: ARG002, PLR6301
+
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+from itertools import accumulate
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+def backends(directory: Path, max_entries: int) -> dict[str, dict]:
+    options = {'MAX_ENTRIES': max_entries}
+    return {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': options,
+        },
+        'filebased': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory / 'files',
+            'OPTIONS': options,
+        },
+        'sqlite': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': directory / 'cache.sqlite3',
+            'OPTIONS': options,
+        },
+    }
+
+
+def work(config: dict, options: dict, seed: int) -> tuple[int, list[float]]:
+    """Прогнать в процессе-воркере чтения с дорисовкой промахов.
+
+    Возвращает число промахов и время каждого чтения в миллисекундах.
+    """
+    backend = import_string(config['BACKEND'])
+    cache = backend(config.get('LOCATION', ''), config)
+    rng = random.Random(seed)
+    # Zipf-like popularity: a few hot fragments and a long tail
+    weights = list(
+        accumulate(1 / rank for rank in range(1, options['keys'] + 1))
+    )
+    value = 'x' * options['value_size']
+    misses, timings = 0, []
+    for key in rng.choices(
+        range(options['keys']), cum_weights=weights, k=options['ops']
+    ):
+        start = time.perf_counter()
+        hit = cache.get(f'fragment:{key}')
+        timings.append((time.perf_counter() - start) * 1000)
+        if hit is None:
+            misses += 1
+            time.sleep(options['render_ms'] / 1000)
+            cache.set(f'fragment:{key}', value)
+    return misses, timings
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить кэши locmem, filebased и SQLite под нагрузкой '
+        'от нескольких процессов: доля попаданий, число дорисовок '
+        'и время чтения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--ops', type=int, default=5000, help='чтений на воркер'
+        )
+        parser.add_argument(
+            '--keys', type=int, default=2000, help='различных фрагментов'
+        )
+        parser.add_argument(
+            '--max-entries',
+            type=int,
+            default=1000,
+            help='лимит записей в каждом кэше',
+        )
+        parser.add_argument(
+            '--value-size', type=int, default=2048, help='размер фрагмента'
+        )
+        parser.add_argument(
+            '--render-ms',
+            type=float,
+            default=1.0,
+            help='стоимость отрисовки фрагмента при промахе',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            configs = backends(Path(directory), options['max_entries'])
+            self.stdout.write(
+                f'{workers} процессов по {options["ops"]} чтений, '
+                f'{options["keys"]} фрагментов, '
+                f'лимит {options["max_entries"]} записей:'
+            )
+            for alias, config in configs.items():
+                start = time.perf_counter()
+                with context.Pool(workers) as pool:
+                    results = pool.starmap(
+                        work,
+                        [(config, options, seed) for seed in range(workers)],
+                    )
+                elapsed = time.perf_counter() - start
+                misses = sum(result[0] for result in results)
+                timings = sorted(
+                    timing for result in results for timing in result[1]
+                )
+                total = len(timings)
+                self.stdout.write(
+                    f'  {alias:<10} попаданий {1 - misses / total:6.1%}  '
+                    f'дорисовок {misses:6}  '
+                    f'p50 {statistics.median(timings):6.3f} ms  '
+                    f'p95 {timings[int(0.95 * (total - 1))]:6.3f} ms  '
+                    f'{total / elapsed:8.0f} чтений/с'
+                )
@@ -0,0 +1,178 @@
+# ruff: noqa: ARG002, PLR6301
+
+import multiprocessing
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from django.db.utils import load_backend
+
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    comments INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES post (id),
+    text TEXT NOT NULL
+);
+CREATE INDEX comment_post ON comment (post_id);
+"""
+
+
+def modes(directory: Path) -> dict[str, dict]:
+    return {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': directory / 'default.sqlite3',
+        },
+        'tuned': {
+            'ENGINE': 'core.sqlite',
+            'NAME': directory / 'tuned.sqlite3',
+        },
+    }
+
+
+def create(path: Path, posts: int) -> None:
+    with sqlite3.connect(path) as db:
+        db.executescript(SCHEMA)
+        db.executemany(
+            'INSERT INTO post (text) VALUES (?)',
+            ((f'Пост {i} ' * 20,) for i in range(posts)),
+        )
+    db.close()
+
+
+def connect(config: dict):
+    # Fills in the defaults Django adds to every DATABASES entry
+    settings_dict = connections.configure_settings({'default': config})
+    backend = load_backend(config['ENGINE'])
+    return backend.DatabaseWrapper(settings_dict['default'], 'benchmark')
+
+
+def work(config: dict, options: dict, seed: int) -> tuple[int, int, list]:
+    """Прогнать в процессе-воркере смесь чтений ленты и комментариев.
+
+    Комментарий пишется как во view: транзакция читает пост, добавляет
+    комментарий и обновляет счётчик. Возвращает число записей, число
+    ошибок и время каждой успешной операции в миллисекундах.
+    """
+    db = connect(config)
+    rng = random.Random(seed)
+    writes, errors, timings = 0, 0, []
+    deadline = time.perf_counter() + options['seconds']
+    while (start := time.perf_counter()) < deadline:
+        post = rng.randrange(options['posts']) + 1
+        try:
+            if rng.random() < options['write_ratio']:
+                comment(db, post)
+                writes += 1
+            else:
+                read_page(db, post)
+        except DatabaseError:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+    db.close()
+    return writes, errors, timings
+
+
+def read_page(db, post: int) -> None:
+    with db.cursor() as cursor:
+        cursor.execute(
+            'SELECT id, text, comments FROM post '
+            'WHERE id <= %s ORDER BY id DESC LIMIT 10',
+            [post],
+        )
+        cursor.fetchall()
+
+
+def write_comment(cursor, post: int) -> None:
+    cursor.execute('SELECT comments FROM post WHERE id = %s', [post])
+    cursor.fetchone()
+    cursor.execute(
+        'INSERT INTO comment (post_id, text) VALUES (%s, %s)',
+        [post, 'Комментарий'],
+    )
+    cursor.execute(
+        'UPDATE post SET comments = comments + 1 WHERE id = %s', [post]
+    )
+
+
+def comment(db, post: int) -> None:
+    # What transaction.atomic() does on a connection outside Django's registry
+    db.set_autocommit(
+        False, force_begin_transaction_with_broken_autocommit=True
+    )
+    try:
+        with db.cursor() as cursor:
+            write_comment(cursor, post)
+        db.commit()
+    except DatabaseError:
+        db.rollback()
+        raise
+    finally:
+        db.set_autocommit(True)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить SQLite с настройками по умолчанию и режим core.sqlite '
+        'при одновременных чтениях и записях из нескольких процессов: '
+        'пропускная способность, ошибки «database is locked» и задержки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--seconds', type=float, default=5, help='длительность прогона'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2, help='доля записей'
+        )
+        parser.add_argument(
+            '--posts', type=int, default=1000, help='постов в базе'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            self.stdout.write(
+                f'{workers} процессов по {options["seconds"]} с, '
+                f'доля записей {options["write_ratio"]:.0%}:'
+            )
+            for alias, config in modes(Path(directory)).items():
+                create(config['NAME'], options['posts'])
+                start = time.perf_counter()
+                with context.Pool(workers) as pool:
+                    results = pool.starmap(
+                        work,
+                        [(config, options, seed) for seed in range(workers)],
+                    )
+                elapsed = time.perf_counter() - start
+                writes = sum(result[0] for result in results)
+                errors = sum(result[1] for result in results)
+                timings = sorted(
+                    timing for result in results for timing in result[2]
+                )
+                total = len(timings)
+                # Every operation may fail when the database stays locked
+                latency = (
+                    f'p50 {statistics.median(timings):7.3f} ms  '
+                    f'p99 {timings[int(0.99 * (total - 1))]:7.3f} ms'
+                    if timings
+                    else 'нет успешных операций'
+                )
+                self.stdout.write(
+                    f'  {alias:<8} {total / elapsed:8.0f} операций/с  '
+                    f'записей {writes / elapsed:6.0f}/с  '
+                    f'ошибок {errors:5}  {latency}'
+                )
@@ -0,0 +1,33 @@
+# ruff: noqa: ARG002
+
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Скопировать основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS, чтобы проверить чтение с реплик локально'
+    )
+
+    def handle(self, *args, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            msg = 'Реплики настраиваются средствами СУБД, команда только для SQLite'
+            raise CommandError(msg)
+        if not settings.DATABASE_REPLICAS:
+            msg = 'DATABASE_REPLICAS пуст'
+            raise CommandError(msg)
+
+        source.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias}: скопировано'))
@@ -0,0 +1,42 @@
+# ruff: noqa: ARG002, PLR6301
+
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+class HybridMiddleware:
+    """Основа middleware, которые работают и под WSGI, и под ASGI.
+
+    Под ASGI Django иначе переводил бы каждый запрос через такую
+    middleware в поток и обратно. Подкласс описывает `around(request)` —
+    контекстный менеджер вокруг остальной цепочки, значение которого
+    вместе с ответом получает `finish(request, response, state)`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        with self.around(request) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def _acall(self, request):
+        with self.around(request) as state:
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
+
+    @contextmanager
+    def around(self, request):
+        yield None
+
+    def finish(self, request, response, state):
+        return response
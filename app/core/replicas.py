@@ -0,0 +1,121 @@
+# ruff: noqa: ARG002, PLR6301
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+from .middleware import HybridMiddleware
+
+PIN_COOKIE = 'replica_pin'
+
+_replica = ContextVar('replica', default=None)
+_request_writes = ContextVar('request_writes', default=None)
+
+
+def is_pinned(request) -> bool:
+    """Недавно ли этот браузер что-то записывал в базу."""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def serving_replica() -> str | None:
+    """Реплика, с которой читает текущий запрос, или None."""
+    return _replica.get()
+
+
+def replica_reads(view):
+    """Разрешить view читать с реплик.
+
+    Браузер, который писал в базу последние `REPLICA_PIN_SECONDS`,
+    продолжает читать с основной базы и видит свои изменения,
+    даже если реплики от неё отстают.
+    """
+
+    @contextmanager
+    def reads(request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in {'GET', 'HEAD'}
+            or is_pinned(request)
+        ):
+            yield
+            return
+        # One replica per request, so the page is consistent with itself
+        token = _replica.set(random.choice(settings.DATABASE_REPLICAS))
+        try:
+            yield
+        finally:
+            _replica.reset(token)
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            with reads(request):
+                return await view(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            with reads(request):
+                return view(request, *args, **kwargs)
+
+    return inner
+
+
+class ReplicaRouter:
+    """Чтения view под `replica_reads` идут на реплики, всё остальное — в default.
+
+    Реплики перечисляются в `DATABASE_REPLICAS`; это копии основной базы,
+    миграции на них не выполняются.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return _replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.append(model)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinMiddleware(HybridMiddleware):
+    """Закрепить браузер за основной базой после запроса, который в неё писал."""
+
+    @contextmanager
+    def around(self, request):
+        writes = []
+        token = _request_writes.set(writes)
+        try:
+            yield writes
+        finally:
+            _request_writes.reset(token)
+
+    def finish(self, request, response, writes):
+        if writes and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
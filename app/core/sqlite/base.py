@@ -0,0 +1,197 @@
+import os
+import random
+import threading
+import time
+
+from django.db.backends.sqlite3 import base
+
+from ..instrumentation import connection_opened
+
+Database = base.Database
+
+# Applied to every new connection; journal_mode = WAL lets readers
+# and the single writer work at the same time
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -32_000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+WRITE_RETRIES = 5
+RETRY_DELAY = 0.05
+
+
+def is_locked(error: Exception) -> bool:
+    return str(error).startswith(('database is locked', 'database is busy'))
+
+
+def is_usable(conn) -> bool:
+    try:
+        conn.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Открытые соединения процесса, которые ждут следующего потока.
+
+    Соединения Django привязаны к потоку, и сервер, который заводит поток
+    на запрос, иначе открывал бы и настраивал соединение каждый раз.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+
+    def _check_fork(self) -> None:
+        # Connections inherited from the parent process belong to it
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._idle = []
+            self._pid = os.getpid()
+
+    def get(self):
+        """Взять живое соединение из пула или None."""
+        self._check_fork()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn = self._idle.pop()
+            if is_usable(conn):
+                return conn
+            conn.close()
+
+    def put(self, conn) -> bool:
+        """Вернуть соединение в пул; False, если его надо закрыть."""
+        self._check_fork()
+        if conn.in_transaction:
+            return False
+        with self._lock:
+            if len(self._idle) >= self.size:
+                return False
+            self._idle.append(conn)
+        return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str, size: int) -> ConnectionPool:
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = ConnectionPool(size)
+        return _pools[name]
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """Курсор, который повторяет запрос, если база занята другим писателем.
+
+    Повторяется только запрос вне транзакции (и `BEGIN` самой транзакции):
+    внутри неё часть изменений уже сделана и повторять их нельзя.
+    """
+
+    retries = WRITE_RETRIES
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, method, *args):
+        attempt = 0
+        while True:
+            try:
+                return method(*args)
+            except Database.OperationalError as error:
+                if (
+                    attempt >= self.retries
+                    or self.connection.in_transaction
+                    or not is_locked(error)
+                ):
+                    raise
+            # Jittered exponential backoff, so waiting writers spread out
+            time.sleep(RETRY_DELAY * 2**attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, настроенный для нескольких процессов-воркеров.
+
+    Каждое соединение получает прагмы из `PRAGMAS` (их можно переопределить
+    в `OPTIONS['pragmas']`). Транзакции по умолчанию начинаются с
+    `BEGIN IMMEDIATE`: писатели выстраиваются в очередь на блокировку
+    записи сразу, а не ловят «database is locked» посреди транзакции.
+    Запросы, упёршиеся в занятую базу, повторяются `OPTIONS['write_retries']`
+    раз. Закрытые соединения возвращаются в пул процесса размером
+    `OPTIONS['pool_size']`.
+    """
+
+    def __init__(self, settings_dict, alias='default'):
+        super().__init__(settings_dict, alias)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**PRAGMAS, **options.get('pragmas', {})}
+        self.cursor_class = type(
+            'SQLiteCursorWrapper',
+            (SQLiteCursorWrapper,),
+            {'retries': options.get('write_retries', WRITE_RETRIES)},
+        )
+        self.pool_size = options.get('pool_size', 0)
+
+    @property
+    def pool(self) -> ConnectionPool | None:
+        # NAME is replaced when the test database is set up
+        if not self.pool_size or self.is_in_memory_db():
+            return None
+        return get_pool(str(self.settings_dict['NAME']), self.pool_size)
+
+    def connect(self):
+        start = time.perf_counter()
+        self.reused = False
+        super().connect()
+        connection_opened(
+            self.alias, time.perf_counter() - start, reused=self.reused
+        )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # An in-memory database (e.g. the test one) has no other processes
+        # to queue behind, and its shared-cache table locks are not waited on
+        if (
+            'transaction_mode' not in self.settings_dict['OPTIONS']
+            and not self.is_in_memory_db()
+        ):
+            self.transaction_mode = 'IMMEDIATE'
+        params.pop('pragmas', None)
+        params.pop('write_retries', None)
+        params.pop('pool_size', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is not None and (conn := pool.get()) is not None:
+            self.reused = True
+            return conn
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):  # noqa: ARG002
+        return self.connection.cursor(factory=self.cursor_class)
+
+    def is_usable(self):
+        return is_usable(self.connection)
+
+    def _close(self):
+        pool = self.pool
+        if pool is not None and pool.put(self.connection):
+            return
+        super()._close()
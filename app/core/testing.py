@@ -0,0 +1,88 @@
+# ruff: noqa: PLR6301
+
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import synthetic
+from posts.models import User
+
+# Rows in each table the views read from; pages hold a tenth of them,
+# so a query per row shows up as a count growing with the size
+DATA_SIZES = (10, 100, 1000)
+
+
+class QueryBudgetMixin:
+    """Проверка числа SQL-запросов view на разных объёмах данных.
+
+    Подмешивается к `TestCase`: сам тестом не считается, иначе
+    запустился бы и без запросов. Подкласс описывает запросы
+    в `requests()`: имя → (бюджет, функция, которая делает запрос
+    и возвращает ответ). База по очереди наполняется до каждого
+    размера из `DATA_SIZES`, на странице помещается десятая часть
+    строк, у каждого поста есть картинка, кэш перед каждым запросом
+    очищается.
+    Тест падает, если запрос превысил бюджет или число запросов
+    выросло вместе с объёмом данных и размером страницы.
+    """
+
+    def populate(self, size: int) -> None:
+        """Дополнить базу до `size` постов, комментариев и подписок."""
+        added = size - getattr(self, 'size', 0)
+        synthetic.generate(
+            users=max(added // 10, 2),
+            groups=max(added // 100, 1),
+            posts=added,
+            comments=added,
+            follows=added,
+            images=2,
+            image_share=1,
+            prefix=f'size{size}_',
+        )
+        self.size = size
+
+    def requests(self) -> dict:
+        return {}
+
+    def client_for(self, user) -> Client:
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_query_budgets(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        counts = {}
+        for size in DATA_SIZES:
+            self.populate(size)
+            per_page = override_settings(
+                POSTS_PER_PAGE=size // 10, COMMENTS_PER_PAGE=size // 10
+            )
+            for name, (budget, request) in self.requests().items():
+                cache.clear()
+                with per_page, CaptureQueriesContext(connection) as queries:
+                    response = request()
+                self.assertLess(response.status_code, 400, name)
+                counts.setdefault(name, {})[size] = len(queries)
+                with self.subTest(view=name, size=size):
+                    self.assertLessEqual(
+                        len(queries),
+                        budget,
+                        '\n'.join(query['sql'] for query in queries),
+                    )
+
+        for name, by_size in counts.items():
+            with self.subTest(view=name):
+                self.assertEqual(
+                    len(set(by_size.values())),
+                    1,
+                    f'число запросов растёт с объёмом данных: {by_size}',
+                )
+
+    def most_active_user(self):
+        return User.objects.order_by(
+            '-stats__following_count', '-stats__posts_count', 'pk'
+        ).first()
@@ -1,6 +1,29 @@
+# ruff: noqa: ARG001, ARG005, PLR6301
+
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import OperationalError, connections, router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
 
-from django.test import TestCase
+from . import instrumentation
+from .cache import SQLiteCache
+from .instrumentation import ConnectionTimingMiddleware
+from .replicas import PIN_COOKIE, ReplicaPinMiddleware, replica_reads
+from .sqlite.base import DatabaseWrapper
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +31,282 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = Path(directory.name) / 'cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        """Запись, чтение, add, incr, touch и удаление."""
+        cache = self.cache
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertIsNone(cache.get('missing'))
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 1))
+        self.assertEqual(cache.incr('new', 5), 6)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2}
+        )
+        self.assertTrue(cache.touch('a', timeout=None))
+        self.assertTrue(cache.delete('a'))
+        self.assertFalse(cache.has_key('a'))
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+
+    def test_expired_entries_are_missing(self):
+        """Истёкшие записи не читаются, и на их место можно сделать add."""
+        self.cache.set('key', 'value', timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        self.assertEqual(self.cache.get('key'), 'fresh')
+
+    def test_zero_timeout_is_not_stored(self):
+        """Запись с нулевым сроком не сохраняется и убирает прежнюю."""
+        self.cache.set('key', 'value')
+        self.cache.set('key', 'other', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        count = self.cache.db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        self.assertEqual(count, (0,))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        cache.access_resolution = 0
+        for key in 'abc':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get_many('abcd'), {'a': 'a', 'd': 'd'})
+
+    def test_size_limit(self):
+        """Суммарный размер значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=4000)
+        for i in range(10):
+            cache.set(i, 'x' * 1000)
+        self.assertLessEqual(len(cache.get_many(range(10))), 4)
+        self.assertEqual(cache.get(9), 'x' * 1000)
+
+    def test_shared_between_connections(self):
+        """Записи одного процесса видны другим, открывшим тот же файл."""
+        self.cache.set('key', 'value')
+        other = self.make_cache()
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_concurrent_writers(self):
+        """Потоки, которые пишут в один объект кэша, не мешают друг другу."""
+        errors = []
+
+        def write(thread: int):
+            try:
+                for i in range(50):
+                    self.cache.set(f'{thread}:{i}', i)
+            except Exception as exc:  # noqa: BLE001
+                errors.append(exc)
+
+        threads = [
+            threading.Thread(target=write, args=(thread,))
+            for thread in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        keys = [f'{thread}:{i}' for thread in range(4) for i in range(50)]
+        self.assertEqual(len(self.cache.get_many(keys)), 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def read_alias(self, request) -> str:
+        model = get_user_model()
+        return replica_reads(lambda request: router.db_for_read(model))(
+            request
+        )
+
+    def test_reads_of_marked_views_go_to_replica(self):
+        """Чтения отмеченных view идут на реплику, остальные — в default."""
+        factory = RequestFactory()
+        self.assertEqual(self.read_alias(factory.get('/')), 'replica')
+        self.assertEqual(self.read_alias(factory.post('/')), 'default')
+        self.assertEqual(router.db_for_read(get_user_model()), 'default')
+
+    def test_writing_browser_is_pinned_to_default(self):
+        """После записи браузер какое-то время читает с основной базы."""
+
+        def write(request):
+            router.db_for_write(get_user_model())
+            return HttpResponse()
+
+        factory = RequestFactory()
+        response = ReplicaPinMiddleware(write)(factory.post('/'))
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.read_alias(pinned), 'default')
+
+        response = ReplicaPinMiddleware(lambda request: HttpResponse())(
+            factory.get('/')
+        )
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'db.sqlite3'
+
+    def connect(self, **options):
+        settings_dict = connections.configure_settings({
+            'default': {
+                'ENGINE': 'core.sqlite',
+                'NAME': self.path,
+                'OPTIONS': options,
+            }
+        })['default']
+        db = DatabaseWrapper(settings_dict, 'test')
+        self.addCleanup(db.close)
+        return db
+
+    def begin(self, db):
+        db.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True
+        )
+
+    def test_pragmas(self):
+        """Соединение получает WAL и прагмы из настроек."""
+        db = self.connect(pragmas={'busy_timeout': 1234})
+        with db.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    def test_transactions_take_write_lock_upfront(self):
+        """Вторая транзакция ждёт на BEGIN, а не падает посреди записи."""
+        writer = self.connect()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        self.begin(writer)
+        other = self.connect(pragmas={'busy_timeout': 0}, write_retries=0)
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            self.begin(other)
+        writer.rollback()
+
+    def test_busy_database_is_retried(self):
+        """Запрос к занятой базе повторяется, пока блокировку не отпустят."""
+        writer = self.connect()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        self.begin(writer)
+        writer.inc_thread_sharing()
+        release = threading.Timer(0.1, writer.commit)
+        release.start()
+        self.addCleanup(release.join)
+        other = self.connect(pragmas={'busy_timeout': 0}, write_retries=10)
+        with other.cursor() as cursor:
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_closed_connections_are_pooled(self):
+        """Закрытое соединение достаётся следующему, сломанное — нет."""
+        first = self.connect(pool_size=1)
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+        second = self.connect(pool_size=1)
+        second.ensure_connection()
+        self.assertIs(second.connection, raw)
+        self.assertTrue(second.reused)
+
+        second.close()
+        raw.close()
+        third = self.connect(pool_size=1)
+        third.ensure_connection()
+        self.assertIsNot(third.connection, raw)
+        self.assertFalse(third.reused)
+
+    def test_connection_time_is_reported(self):
+        """Время открытия соединений попадает в Server-Timing."""
+
+        def view(request):
+            self.connect().ensure_connection()
+            return HttpResponse()
+
+        response = ConnectionTimingMiddleware(view)(RequestFactory().get('/'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db-connect;dur=[\d.]+;desc="1 opened, 1 new"$',
+        )
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+
+    def test_posts_views_are_measured(self):
+        """Запросы к posts:* замеряются, остальные — нет."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total',
+        )
+        self.client.get(reverse('about:author'))
+        summary = instrumentation.summary()
+        self.assertEqual(list(summary), ['posts:index'])
+        index = summary['posts:index']
+        self.assertEqual(index['count'], 1)
+        self.assertGreater(index['queries']['p50'], 0)
+        self.assertGreater(index['template_ms']['p50'], 0)
+        self.assertGreaterEqual(
+            index['total_ms']['p50'], index['template_ms']['p50']
+        )
+
+    async def test_asgi_requests_are_measured(self):
+        """Под ASGI запросы к базе идут из другого потока и тоже считаются."""
+        response = await self.async_client.get(reverse('posts:index'))
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        summary = instrumentation.summary()
+        self.assertGreater(summary['posts:index']['queries']['p50'], 0)
+
+    def test_asgi_middleware_is_not_adapted(self):
+        """Под ASGI ни одну middleware не приходится переводить в поток."""
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    @override_settings(REQUEST_BUDGETS={'queries': 0, 'total_ms': 10_000})
+    def test_requests_over_budget_are_logged(self):
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('queries', logs.output[0])
+        self.assertNotIn('total_ms', logs.output[0])
+
+    def test_metrics_are_for_staff_only(self):
+        url = reverse('request_metrics')
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+        staff = get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertIn('posts:index', self.client.get(url).json())
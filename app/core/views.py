@@ -1,7 +1,11 @@
 # ruff: noqa: ARG001
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -17,3 +21,11 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def request_metrics(request):
+    """Перцентили метрик запросов к view, замеренных этим процессом."""
+    return JsonResponse(
+        instrumentation.summary(), json_dumps_params={'ensure_ascii': False}
+    )
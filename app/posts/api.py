@@ -0,0 +1,310 @@
+# ruff: noqa: ARG001, ARG005
+
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, HttpRequest, JsonResponse
+from django.views.decorators.http import require_safe
+
+from . import caching
+from .models import Comment, Group, Post, User
+from .pagination import InvalidCursorError, ValuesPaginator
+from .timeline import TimelinePaginator, followed_celebrities
+from .views import group_scopes, post_scopes, profile_scopes
+
+# Field of the response → lookup passed to values()
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+PROFILE_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'stats__posts_count',
+    'followers_count': 'stats__followers_count',
+    'following_count': 'stats__following_count',
+}
+POST_ORDERING = ('-pub_date', '-pk')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def image_url(name: str) -> str | None:
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+# Lookups whose stored value is not what a client can use
+CONVERTERS = {'image': image_url}
+
+
+def selected_fields(request: HttpRequest, fields: dict) -> dict:
+    """Поля ответа из `?fields=a,b`, по умолчанию все."""
+    names = [
+        name.strip()
+        for name in request.GET.get('fields', '').split(',')
+        if name.strip()
+    ]
+    if not names:
+        return fields
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        msg = (
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(fields)}'
+        )
+        raise FieldsError(msg)
+    return {name: fields[name] for name in names}
+
+
+def serialize(rows, fields: dict) -> list[dict]:
+    """Словари из `values()` → объекты ответа, без экземпляров моделей."""
+    converters = {
+        name: CONVERTERS[lookup]
+        for name, lookup in fields.items()
+        if lookup in CONVERTERS
+    }
+    result = []
+    for row in rows:
+        item = {name: row[lookup] for name, lookup in fields.items()}
+        for name, convert in converters.items():
+            item[name] = convert(item[name])
+        result.append(item)
+    return result
+
+
+def respond(data: dict, status: int = 200) -> JsonResponse:
+    # Cyrillic in UTF-8 takes a third of the bytes of \u escapes
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def error(message: str, status: int) -> JsonResponse:
+    return respond({'error': message}, status=status)
+
+
+def page_url(request: HttpRequest, cursor: str | None) -> str | None:
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def page_data(request: HttpRequest, page, results: list) -> dict:
+    return {
+        'results': results,
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }
+
+
+def page_response(
+    request: HttpRequest,
+    queryset,
+    fields: dict,
+    per_page: int,
+    ordering=POST_ORDERING,
+) -> JsonResponse:
+    """Страница записей `queryset` по курсору из `?cursor=`."""
+    selected = selected_fields(request, fields)
+    keys = [field.removeprefix('-') for field in ordering]
+    rows = queryset.values(*dict.fromkeys([*selected.values(), *keys]))
+    page = ValuesPaginator(rows, per_page, ordering=ordering).page(
+        request.GET.get('cursor')
+    )
+    return respond(
+        page_data(request, page, serialize(page.object_list, selected))
+    )
+
+
+def object_response(
+    request: HttpRequest, queryset, fields: dict, **lookup
+) -> JsonResponse:
+    selected = selected_fields(request, fields)
+    row = queryset.filter(**lookup).values(*selected.values()).first()
+    if row is None:
+        raise Http404
+    return respond(serialize([row], selected)[0])
+
+
+def api_view(view):
+    """Только GET и HEAD; ошибки — в JSON, а не HTML-страницей."""
+
+    @require_safe
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return error('Не найдено', 404)
+        except (FieldsError, InvalidCursorError) as exc:
+            return error(str(exc), 400)
+
+    return inner
+
+
+def pk_or_404(queryset, **lookup) -> int:
+    pk = queryset.filter(**lookup).values_list('pk', flat=True).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+def with_comments(page_scopes):
+    """Области списка постов: в нём есть число комментариев каждого."""
+
+    @wraps(page_scopes)
+    def scopes(request: HttpRequest, *args, **kwargs) -> list | None:
+        found = page_scopes(request, *args, **kwargs)
+        return None if found is None else [*found, caching.COMMENTS]
+
+    return scopes
+
+
+@api_view
+@caching.conditional(
+    with_comments(lambda request: [caching.INDEX]), csrf=False
+)
+def posts(request: HttpRequest):
+    return page_response(
+        request, Post.objects.all(), POST_FIELDS, settings.POSTS_PER_PAGE
+    )
+
+
+@api_view
+@caching.conditional(post_scopes, csrf=False)
+def post(request: HttpRequest, post_id: int):
+    return object_response(request, Post.objects, POST_FIELDS, pk=post_id)
+
+
+def comments_scopes(request: HttpRequest, post_id: int) -> list:
+    return [caching.post_scope(post_id)]
+
+
+@api_view
+@caching.conditional(comments_scopes, csrf=False)
+def comments(request: HttpRequest, post_id: int):
+    pk_or_404(Post.objects, pk=post_id)
+    return page_response(
+        request,
+        Comment.objects.filter(post=post_id),
+        COMMENT_FIELDS,
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'pk'),
+    )
+
+
+@api_view
+@caching.conditional(lambda request: [], csrf=False)
+def groups(request: HttpRequest):
+    return page_response(
+        request,
+        Group.objects.all(),
+        GROUP_FIELDS,
+        settings.GROUPS_PER_PAGE,
+        ordering=('slug',),
+    )
+
+
+@api_view
+@caching.conditional(group_scopes, csrf=False)
+def group(request: HttpRequest, slug: str):
+    return object_response(request, Group.objects, GROUP_FIELDS, slug=slug)
+
+
+@api_view
+@caching.conditional(with_comments(group_scopes), csrf=False)
+def group_posts(request: HttpRequest, slug: str):
+    group_id = pk_or_404(Group.objects, slug=slug)
+    return page_response(
+        request,
+        Post.objects.filter(group=group_id),
+        POST_FIELDS,
+        settings.POSTS_PER_PAGE,
+    )
+
+
+@api_view
+@caching.conditional(profile_scopes, csrf=False)
+def profile(request: HttpRequest, username: str):
+    return object_response(
+        request, User.objects, PROFILE_FIELDS, username=username
+    )
+
+
+@api_view
+@caching.conditional(with_comments(profile_scopes), csrf=False)
+def profile_posts(request: HttpRequest, username: str):
+    author_id = pk_or_404(User.objects, username=username)
+    return page_response(
+        request,
+        Post.objects.filter(author=author_id),
+        POST_FIELDS,
+        settings.POSTS_PER_PAGE,
+    )
+
+
+def follow_scopes(request: HttpRequest) -> list | None:
+    if not request.user.is_authenticated:
+        return None
+    return [
+        caching.follow_scope(request.user.pk),
+        *map(caching.author_scope, followed_celebrities(request.user)),
+    ]
+
+
+@api_view
+@caching.conditional(with_comments(follow_scopes), csrf=False)
+def follow(request: HttpRequest):
+    """Лента подписок.
+
+    Страница выбирается по материализованной ленте и постам популярных
+    авторов, как на HTML-странице; выбранные поля её постов читаются
+    одним запросом через `values()`.
+    """
+    if not request.user.is_authenticated:
+        return error('Нужно войти', 401)
+    selected = selected_fields(request, POST_FIELDS)
+    entries = request.user.timeline.select_related('post').only(
+        'pub_date', 'post__pub_date'
+    )
+    page = TimelinePaginator(
+        entries,
+        settings.POSTS_PER_PAGE,
+        celebrities=followed_celebrities(request.user),
+    ).page(request.GET.get('cursor'))
+    ids = [post.pk for post in page.object_list]
+    rows = {
+        row['pk']: row
+        for row in Post.objects.filter(pk__in=ids).values(
+            'pk', *selected.values()
+        )
+    }
+    # A post deleted after the page was chosen is left out
+    found = [rows[pk] for pk in ids if pk in rows]
+    return respond(page_data(request, page, serialize(found, selected)))
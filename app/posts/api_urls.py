@@ -0,0 +1,21 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.posts, name='posts'),
+    path('posts/<int:post_id>/', api.post, name='post'),
+    path('posts/<int:post_id>/comments/', api.comments, name='comments'),
+    path('groups/', api.groups, name='groups'),
+    path('groups/<slug:slug>/', api.group, name='group'),
+    path('groups/<slug:slug>/posts/', api.group_posts, name='group_posts'),
+    path('profiles/<str:username>/', api.profile, name='profile'),
+    path(
+        'profiles/<str:username>/posts/',
+        api.profile_posts,
+        name='profile_posts',
+    ),
+    path('follow/', api.follow, name='follow'),
+]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Управление записями в блоге'
+
+    def ready(self):  # noqa: PLR6301
+        from . import signals  # noqa: F401
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from . import caching, counters, search, timeline
+from .models import CreationDateTimeField
+
+BATCH_SIZE = 1000
+
+
+@contextmanager
+def explicit_dates():
+    """Дать массовой вставке свои даты вместо auto_now_add.
+
+    Действует только в текущем потоке или асинхронной задаче.
+    """
+    token = CreationDateTimeField.explicit.set(True)
+    try:
+        yield
+    finally:
+        CreationDateTimeField.explicit.reset(token)
+
+
+def last_id(model) -> int:
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return last or 0
+
+
+def rebuild_derived(report=None) -> None:
+    """Пересчитать всё, что сигналы не обновили при массовой вставке.
+
+    Счётчики, популярные авторы, ленты подписок и поисковый индекс
+    строятся заново, закэшированные страницы сбрасываются.
+    """
+    report = report or (lambda _: None)
+    with transaction.atomic():
+        counters.recount_users()
+        counters.recount_posts()
+    report('счётчики пересчитаны')
+    with transaction.atomic():
+        report(f'записей в лентах: {timeline.rebuild()}')
+    with transaction.atomic():
+        search.rebuild()
+    report('поисковый индекс построен')
+    caching.site_changed()
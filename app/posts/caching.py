@@ -0,0 +1,235 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag,
+)
+
+from core import replicas
+
+from .models import Follow, Post
+from .timeline import is_celebrity
+from .utils import auser
+
+SITE = ('site',)
+INDEX = ('index',)
+# Comment counters of posts: lists that show them depend on every comment
+COMMENTS = ('comments',)
+
+
+def _key(scope) -> str:
+    return 'feed-generation:' + ':'.join(map(str, scope))
+
+
+def group_scope(group_id: int) -> tuple:
+    return ('group', group_id)
+
+
+def author_scope(author_id: int) -> tuple:
+    return ('author', author_id)
+
+
+def follow_scope(user_id: int) -> tuple:
+    return ('follow', user_id)
+
+
+def profile_scope(user_id: int) -> tuple:
+    return ('profile', user_id)
+
+
+def post_scope(post_id: int) -> tuple:
+    return ('post', post_id)
+
+
+def generations(*scopes) -> list[int]:
+    """Поколения всех областей, от которых зависит страница, и сайта целиком.
+
+    Поколение — это время последнего изменения в наносекундах, поэтому
+    вытесненное из кэша поколение не может вернуться со старым значением.
+    """
+    keys = [_key(scope) for scope in (SITE, *scopes)]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        found.update(cache.get_many(missing))
+    # A key evicted right after add() falls back to the current time
+    return [found.get(key) or time.time_ns() for key in keys]
+
+
+def feed_version(*scopes) -> str:
+    """Версия фрагментов ленты."""
+    return '.'.join(map(str, generations(*scopes)))
+
+
+def bump(*scopes) -> None:
+    """Начать новое поколение областей: их фрагменты перестают находиться.
+
+    Поколение сдвигается сразу и ещё раз после фиксации транзакции, чтобы
+    не остался фрагмент, закэшированный параллельным запросом по старым
+    данным между этими моментами.
+    """
+    if not scopes:
+        return
+    keys = [_key(scope) for scope in scopes]
+    renew = lambda: cache.set_many(
+        dict.fromkeys(keys, time.time_ns()), timeout=None
+    )
+    renew()
+    transaction.on_commit(renew)
+
+
+def post_changed(post: Post) -> None:
+    """Сбросить все ленты, в которых показывается пост."""
+    scopes = [INDEX, author_scope(post.author_id), post_scope(post.pk)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    # Feeds of popular authors' followers depend on the author scope,
+    # everyone else's follow feed has its own generation
+    if not is_celebrity(post.author_id):
+        followers = Follow.objects.filter(author=post.author_id)
+        scopes += [
+            follow_scope(user_id)
+            for user_id in followers.values_list('user', flat=True)
+        ]
+    bump(*scopes)
+
+
+def site_changed() -> None:
+    bump(SITE)
+
+
+def feed_context(*scopes) -> dict:
+    """Переменные шаблона для тега `{% cache %}` вокруг ленты.
+
+    Реплика может ещё не видеть записи, которая сдвинула поколение,
+    поэтому отрисованное по ней в кэш не попадает.
+    """
+    timeout = settings.FEED_CACHE_TIMEOUT
+    return {
+        'feed_version': feed_version(*scopes),
+        'feed_cache_timeout': 0 if replicas.serving_replica() else timeout,
+    }
+
+
+def conditional(page_scopes, *, csrf: bool = True):
+    """Отвечать 304, пока не сменилось поколение ни одной области страницы.
+
+    `page_scopes(request, *args, **kwargs)` возвращает области, от которых
+    зависит страница, или None, если объекта нет — тогда view отработает
+    как обычно. Поколения сдвигаются при каждой записи, так что валидаторы
+    учитывают и правки, и удаления, а проверка не рендерит страницу.
+    Подходит и для асинхронных view. `csrf=False` — для ответов,
+    в которые не встраивается CSRF-токен. Страница, прочитанная
+    с реплики, валидаторов не получает: она может отставать
+    от поколений, по которым они посчитаны. Без общего кэша
+    (`SHARED_CACHE`) валидаторов нет совсем: поколения другого процесса
+    не знают о записях, которые обработал этот.
+    """
+
+    def validators(request, *args, **kwargs) -> str | None:
+        if not settings.SHARED_CACHE:
+            return None
+        scopes = page_scopes(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        versions = generations(*scopes)
+        # The page also shows who is logged in and embeds a token masked
+        # from the CSRF secret; get_token() issues one if there is none
+        parts = [request.get_full_path(), request.user.pk, *versions]
+        if csrf:
+            get_token(request)
+            parts.append(request.META['CSRF_COOKIE'])
+        # No Last-Modified: a generation is when a scope was last reset
+        # or first seen by the cache, not when its data changed
+        return quote_etag(
+            hashlib.md5(
+                '\x00'.join(map(str, parts)).encode(),
+                usedforsecurity=False,
+            ).hexdigest()
+        )
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_conditional(view, validators)
+        return _sync_conditional(view, validators)
+
+    return decorator
+
+
+def _set_validators(response, etag: str):
+    if response.status_code == 304 or (
+        response.status_code == 200 and not replicas.serving_replica()
+    ):
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _sync_conditional(view, validators):
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if request.method not in {'GET', 'HEAD'}:
+            return view(request, *args, **kwargs)
+        etag = validators(request, *args, **kwargs)
+        if etag is None:
+            return view(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        return _set_validators(response, etag)
+
+    return inner
+
+
+def _async_conditional(view, validators):
+    # Scopes and generations are read in one trip to a thread
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method not in {'GET', 'HEAD'}:
+            return await view(request, *args, **kwargs)
+        # Loaded here, the user is shared by the check and the view
+        await auser(request)
+        etag = await sync_to_async(validators)(request, *args, **kwargs)
+        if etag is None:
+            return await view(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await view(request, *args, **kwargs)
+        return _set_validators(response, etag)
+
+    return inner
+
+
+def card_key(post: Post, *flags) -> str:
+    """Ключ отрисованной карточки поста.
+
+    Версией служит отпечаток всего, что выводится в карточке: правка поста,
+    переименование автора или группы дают новый ключ без явного сброса,
+    а старые карточки просто истекают.
+    """
+    author, group = post.author, post.group
+    parts = (
+        post.text,
+        post.image.name,
+        post.pub_date.isoformat(),
+        author.username,
+        author.first_name,
+        author.last_name,
+        group and group.slug,
+        group and group.title,
+        *flags,
+    )
+    digest = hashlib.md5(
+        '\x00'.join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'post-card:{post.pk}:{digest}'
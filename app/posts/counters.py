@@ -0,0 +1,87 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE = 1000
+
+
+def _count(model, field: str):
+    """Подзапрос с числом строк `model`, ссылающихся на текущую запись."""
+    rows = (
+        model.objects
+        .filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def _shift(queryset, **deltas) -> int:
+    return queryset.update(**{
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    })
+
+
+def change_user_stats(user_id: int, **deltas) -> None:
+    """Сдвинуть счётчики пользователя, заведя их при первом росте."""
+    updated = _shift(UserStats.objects.filter(user=user_id), **deltas)
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        recount_users(User.objects.filter(pk=user_id))
+
+
+def change_comments_count(post_id: int, delta: int) -> None:
+    _shift(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def recount_posts(posts=None, *, dry_run: bool = False) -> int:
+    """Пересчитать число комментариев у постов и вернуть число расхождений."""
+    posts = Post.objects.all() if posts is None else posts
+    actual = _count(Comment, 'post')
+    drifted = posts.annotate(actual=actual).exclude(comments_count=F('actual'))
+    found = drifted.count()
+    if found and not dry_run:
+        Post.objects.filter(pk__in=drifted.values('pk')).update(
+            comments_count=actual
+        )
+    return found
+
+
+def recount_users(users=None, *, dry_run: bool = False) -> int:
+    """Пересчитать счётчики пользователей и вернуть число расхождений.
+
+    Пользователям без строки счётчиков она заводится.
+    """
+    users = User.objects.all() if users is None else users
+    actual = {
+        'posts_count': _count(Post, 'author'),
+        'followers_count': _count(Follow, 'author'),
+        'following_count': _count(Follow, 'user'),
+    }
+    drifted = (
+        UserStats.objects
+        .filter(user__in=users.values('pk'))
+        .annotate(**{
+            f'actual_{name}': value for name, value in actual.items()
+        })
+        .filter(
+            ~Q(posts_count=F('actual_posts_count'))
+            | ~Q(followers_count=F('actual_followers_count'))
+            | ~Q(following_count=F('actual_following_count'))
+        )
+    )
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    found = drifted.count() + missing.count()
+    if found and not dry_run:
+        UserStats.objects.bulk_create(
+            (
+                UserStats(user_id=user_id)
+                for user_id in missing.iterator(chunk_size=BATCH_SIZE)
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        UserStats.objects.filter(pk__in=drifted.values('pk')).update(**actual)
+    return found
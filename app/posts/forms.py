@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import normalize_image
 from .models import Comment, Post
 
 
@@ -13,6 +15,13 @@ class PostForm(ModelForm):
             'image': 'Иллюстрация к посту',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # The file already stored with the post was processed on upload
+        if isinstance(image, UploadedFile):
+            return normalize_image(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
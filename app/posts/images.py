@@ -0,0 +1,72 @@
+import io
+from pathlib import PurePath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Formats stored as uploaded; anything else is converted to JPEG
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'GIF': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+JPEG_MODES = {'RGB', 'L'}
+
+
+def normalize_image(upload):
+    """Подготовить загруженную картинку поста к хранению.
+
+    Отклоняет слишком тяжёлые файлы и картинки с чрезмерным числом
+    пикселей ещё до декодирования, уменьшает изображение до
+    `POST_IMAGE_MAX_SIDE`, поворачивает по EXIF и перекодирует без
+    метаданных. Анимации сохраняются как есть.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        msg = 'Файл больше %(limit)s.'
+        raise ValidationError(
+            msg,
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)},
+        )
+    upload.seek(0)
+    try:
+        # Only the header is read here, the pixels are decoded later
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        msg = 'Не удалось прочитать изображение.'
+        raise ValidationError(msg, code='invalid_image') from None
+    if image.width * image.height > settings.POST_IMAGE_MAX_PIXELS:
+        msg = 'Изображение больше %(limit)s мегапикселей.'
+        raise ValidationError(
+            msg,
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10**6},
+        )
+    if getattr(image, 'n_frames', 1) > 1:
+        upload.seek(0)
+        return upload
+
+    source_format = image.format
+    image_format = source_format if source_format in SAVE_OPTIONS else 'JPEG'
+    side = settings.POST_IMAGE_MAX_SIDE
+    # Shrinking first lets JPEG decode straight at a reduced scale
+    image.thumbnail((side, side))
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in JPEG_MODES:
+        image = image.convert('RGB')
+
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        icc_profile=image.info.get('icc_profile'),
+        **SAVE_OPTIONS[image_format],
+    )
+    name = PurePath(upload.name)
+    if image_format != source_format:
+        name = name.with_suffix('.jpg')
+    return ContentFile(buffer.getvalue(), name=name.name)
@@ -0,0 +1,325 @@
+# ruff: noqa: ARG002, PLR6301
+
+import json
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import instrumentation
+from posts import synthetic, thumbnails
+from posts.models import Group, Post, User
+
+SCENARIOS = {
+    'index': 'posts:index',
+    'group_posts': 'posts:group_list',
+    'profile': 'posts:profile',
+    'post_detail': 'posts:post_detail',
+    'follow_index': 'posts:follow_index',
+    'add_comment': 'posts:add_comment',
+}
+READERS = 20
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Workload:
+    """Запросы сценариев к синтетическим данным.
+
+    Популярные сообщества, авторы и свежие посты запрашиваются чаще,
+    в том же степенном распределении, что и при генерации данных.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.anonymous = Client()
+        self.groups = list(
+            Group.objects.order_by('pk').values_list('slug', flat=True)
+        )
+        self.authors = list(
+            User.objects.order_by('-stats__posts_count', 'pk').values_list(
+                'username', flat=True
+            )
+        )
+        self.posts = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )[: synthetic.BATCH_SIZE * 10]
+        )
+        self.readers = []
+        for reader in User.objects.filter(
+            stats__following_count__gt=0
+        ).order_by('-stats__following_count', 'pk')[:READERS]:
+            client = Client()
+            client.force_login(reader)
+            self.readers.append(client)
+        self.weights = {
+            id(items): synthetic.power_law(len(items))
+            for items in (self.groups, self.authors, self.posts)
+        }
+
+    def pick(self, items: list):
+        (item,) = self.rng.choices(items, cum_weights=self.weights[id(items)])
+        return item
+
+    def target(self, scenario: str) -> tuple[Client, str]:
+        """Клиент и адрес следующего запроса сценария."""
+        if scenario == 'index':
+            return self.anonymous, reverse('posts:index')
+        if scenario == 'group_posts':
+            return self.anonymous, reverse(
+                'posts:group_list', args=[self.pick(self.groups)]
+            )
+        if scenario == 'profile':
+            return self.anonymous, reverse(
+                'posts:profile', args=[self.pick(self.authors)]
+            )
+        if scenario == 'post_detail':
+            return self.anonymous, reverse(
+                'posts:post_detail', args=[self.pick(self.posts)]
+            )
+        reader = self.rng.choice(self.readers)
+        if scenario == 'follow_index':
+            return reader, reverse('posts:follow_index')
+        return reader, reverse(
+            'posts:add_comment', args=[self.pick(self.posts)]
+        )
+
+    def request(self, scenario: str):
+        client, path = self.target(scenario)
+        if scenario == 'add_comment':
+            return client.post(path, {'text': synthetic.sentence(self.rng, 8)})
+        return client.get(path)
+
+    def available(self, scenario: str) -> bool:
+        if scenario == 'group_posts':
+            return bool(self.groups)
+        if scenario in {'post_detail', 'add_comment'} and not self.posts:
+            return False
+        if scenario in {'follow_index', 'add_comment'}:
+            return bool(self.readers)
+        return True
+
+
+class Command(BaseCommand):
+    # Runs are comparable only if these options match
+    recorded_options = (
+        'users',
+        'groups',
+        'posts',
+        'comments',
+        'follows',
+        'images',
+        'requests',
+        'cold',
+        'seed',
+    )
+    help = (
+        'Замерить ленты и страницы постов на синтетических данных во '
+        'временной базе: запросов в секунду, перцентили времени ответа '
+        'и число SQL-запросов по сценариям. Результаты можно сохранить '
+        'и сравнить с прогоном на другом коммите.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--follows', type=int, default=40000)
+        parser.add_argument(
+            '--images', type=int, default=10, help='различных картинок'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200, help='запросов на сценарий'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=20,
+            help='запросов перед замером, не входящих в результат',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='очищать кэш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=SCENARIOS,
+            help='прогнать только эти сценарии',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', type=Path, help='сохранить результаты в JSON'
+        )
+        parser.add_argument(
+            '--compare',
+            type=Path,
+            help='сравнить с результатами, сохранёнными через --output',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as temporary:
+            directory = Path(temporary)
+            test_settings = connection.settings_dict['TEST']
+            saved_name = test_settings['NAME']
+            # A file rather than the in-memory default, to measure real I/O
+            test_settings['NAME'] = str(directory / 'benchmark.sqlite3')
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                with override_settings(
+                    DEBUG=False,
+                    MEDIA_ROOT=directory / 'media',
+                    CACHES={
+                        'default': {
+                            'BACKEND': (
+                                'django.core.cache.backends.locmem.LocMemCache'
+                            ),
+                        }
+                    },
+                    THUMBNAIL_WORKERS=0,
+                    REQUEST_METRICS_NAMESPACES=['posts'],
+                    REQUEST_METRICS_SAMPLES=options['requests'],
+                    REQUEST_BUDGETS={},
+                ):
+                    results = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings['NAME'] = saved_name
+
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(results, ensure_ascii=False, indent=2)
+            )
+        if options['compare']:
+            self.compare(json.loads(options['compare'].read_text()), results)
+
+    def run(self, options: dict) -> dict:
+        self.populate(options)
+        workload = Workload(random.Random(options['seed']))
+        scenarios = {}
+        self.write_header()
+        for scenario in options['scenario'] or SCENARIOS:
+            if not workload.available(scenario):
+                self.stdout.write(f'{scenario:<13}нет данных')
+                continue
+            scenarios[scenario] = self.measure(workload, scenario, options)
+            self.write_row(scenario, scenarios[scenario])
+        return self.results(options, scenarios)
+
+    def populate(self, options: dict) -> None:
+        start = time.perf_counter()
+        synthetic.generate(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            seed=options['seed'],
+        )
+        for name in set(
+            Post.objects.exclude(image='').values_list('image', flat=True)
+        ):
+            thumbnails.prepare(name)
+        self.stdout.write(
+            f'Данные созданы за {time.perf_counter() - start:.1f} с'
+        )
+
+    def results(self, options: dict, scenarios: dict) -> dict:
+        return {
+            'commit': current_commit(),
+            'options': {name: options[name] for name in self.recorded_options},
+            'scenarios': scenarios,
+        }
+
+    def measure(self, workload: Workload, scenario: str, options) -> dict:
+        for _ in range(options['warmup']):
+            workload.request(scenario)
+        instrumentation.reset()
+        elapsed = 0.0
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            start = time.perf_counter()
+            workload.request(scenario)
+            elapsed += time.perf_counter() - start
+        metrics = instrumentation.summary()[SCENARIOS[scenario]]
+        return {
+            'rps': round(options['requests'] / elapsed, 1),
+            **{
+                f'{name}_ms': value
+                for name, value in metrics['total_ms'].items()
+            },
+            'queries_p50': metrics['queries']['p50'],
+            'queries_p99': metrics['queries']['p99'],
+        }
+
+    def write_header(self) -> None:
+        self.stdout.write(
+            f'{"сценарий":<13}{"запр/с":>8}{"p50 ms":>9}{"p95 ms":>9}'
+            f'{"p99 ms":>9}{"SQL p50":>9}{"SQL p99":>9}'
+        )
+
+    def write_row(self, scenario: str, result: dict) -> None:
+        self.stdout.write(
+            f'{scenario:<13}{result["rps"]:>8.0f}{result["p50_ms"]:>9.2f}'
+            f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+            f'{result["queries_p50"]:>9.0f}{result["queries_p99"]:>9.0f}'
+        )
+
+    def compare(self, previous: dict, current: dict) -> None:
+        if previous['options'] != current['options']:
+            self.stderr.write(
+                'Прогоны сделаны с разными параметрами, сравнение неточно'
+            )
+        self.stdout.write(
+            f'Изменение относительно {previous.get("commit") or "прошлого"}:'
+        )
+        for scenario, result in current['scenarios'].items():
+            before = previous['scenarios'].get(scenario)
+            if before is None:
+                continue
+            self.stdout.write(
+                f'{scenario:<13}'
+                + ''.join(
+                    f'{change(before[name], result[name]):>9}'
+                    for name in (
+                        'rps',
+                        'p50_ms',
+                        'p95_ms',
+                        'p99_ms',
+                        'queries_p50',
+                        'queries_p99',
+                    )
+                )
+            )
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return '—' if not after else '+∞'
+    return f'{(after - before) / before:+.0%}'
@@ -0,0 +1,230 @@
+# ruff: noqa: ARG005, PLR6301
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+from core import instrumentation
+
+from . import benchmark_feeds
+from .benchmark_feeds import SCENARIOS, Workload
+
+READ_SCENARIOS = [
+    'index',
+    'group_posts',
+    'profile',
+    'post_detail',
+    'follow_index',
+]
+
+
+def cookie_header(client) -> str:
+    return '; '.join(
+        f'{morsel.key}={morsel.value}' for morsel in client.cookies.values()
+    )
+
+
+def wsgi_request(handler, path: str, cookie: str, delay: float) -> int:
+    """Запрос к WSGI-приложению от клиента, который медленно читает ответ.
+
+    Синхронный сервер занимает поток, пока ответ не отдан клиенту.
+    """
+    url = urlsplit(path)
+    environ = {
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'HTTP_HOST': 'testserver',
+        'HTTP_COOKIE': cookie,
+        'wsgi.input': BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    response = handler(
+        environ, lambda status, headers, exc_info=None: statuses.append(status)
+    )
+    try:
+        for _ in response:
+            pass
+        time.sleep(delay)
+    finally:
+        # Sends request_finished, which gives the connection back
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_request(application, path: str, cookie: str, delay: float):
+    """Запрос к ASGI-приложению от клиента, который медленно читает ответ.
+
+    Пока ответ уходит клиенту, цикл событий обслуживает другие запросы.
+    """
+    url = urlsplit(path)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url.path,
+        'raw_path': url.path.encode(),
+        'query_string': url.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    received = False
+    sent = asyncio.Event()
+    statuses = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect until the response is sent
+        await sent.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        elif not message.get('more_body'):
+            await asyncio.sleep(delay)
+            sent.set()
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+class Command(benchmark_feeds.Command):
+    recorded_options = (
+        *benchmark_feeds.Command.recorded_options,
+        'clients',
+        'threads',
+        'client_delay',
+    )
+    help = (
+        'Сравнить WSGI и ASGI на синтетических данных во временной базе: '
+        'одновременные клиенты, которые медленно читают ответы, '
+        'запрашивают ленты и страницы постов. WSGI обслуживает их пулом '
+        'потоков, как синхронный сервер, ASGI — циклом событий. Выводятся '
+        'запросов в секунду и перцентили времени ответа, которое видит '
+        'клиент.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=50,
+            help='одновременных клиентов',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='потоков WSGI-сервера',
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=200,
+            help='сколько миллисекунд клиент получает ответ',
+        )
+
+    def run(self, options: dict) -> dict:
+        self.populate(options)
+        workload = Workload(random.Random(options['seed']))
+        scenarios = {}
+        for server in ('wsgi', 'asgi'):
+            self.stdout.write(server.upper())
+            self.write_header()
+            for scenario in options['scenario'] or READ_SCENARIOS:
+                if scenario not in READ_SCENARIOS:
+                    continue
+                if not workload.available(scenario):
+                    self.stdout.write(f'{scenario:<13}нет данных')
+                    continue
+                result = self.measure_server(
+                    server, workload, scenario, options
+                )
+                scenarios[f'{server}:{scenario}'] = result
+                self.write_row(scenario, result)
+        return self.results(options, scenarios)
+
+    def measure_server(
+        self, server: str, workload: Workload, scenario: str, options
+    ) -> dict:
+        delay = options['client_delay'] / 1000
+        targets = []
+        for _ in range(options['warmup'] + options['requests']):
+            client, path = workload.target(scenario)
+            targets.append((path, cookie_header(client)))
+        warmup = targets[: options['warmup']]
+        measured = targets[options['warmup'] :]
+
+        if server == 'wsgi':
+            handler = WSGIHandler()
+            pool = ThreadPoolExecutor(options['threads'])
+
+            async def request(path, cookie):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    pool, wsgi_request, handler, path, cookie, delay
+                )
+
+        else:
+            application = ASGIHandler()
+
+            async def request(path, cookie):
+                return await asgi_request(application, path, cookie, delay)
+
+        async def load(targets: list) -> tuple[list, float]:
+            pending = iter(targets)
+            latencies = []
+
+            async def client():
+                # Each client sends its next request once it has read
+                # the previous response
+                for path, cookie in pending:
+                    start = time.perf_counter()
+                    status = await request(path, cookie)
+                    latencies.append(time.perf_counter() - start)
+                    if status != 200:
+                        msg = f'{path}: ответ {status}'
+                        raise RuntimeError(msg)
+
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(client() for _ in range(options['clients']))
+            )
+            return latencies, time.perf_counter() - start
+
+        try:
+            asyncio.run(load(warmup))
+            instrumentation.reset()
+            latencies, elapsed = asyncio.run(load(measured))
+        finally:
+            if server == 'wsgi':
+                pool.shutdown()
+        latencies = sorted(latency * 1000 for latency in latencies)
+        metrics = instrumentation.summary()[SCENARIOS[scenario]]
+        return {
+            'rps': round(len(latencies) / elapsed, 1),
+            **{
+                f'p{round(fraction * 100)}_ms': round(
+                    instrumentation.percentile(latencies, fraction), 2
+                )
+                for fraction in (0.5, 0.95, 0.99)
+            },
+            'queries_p50': metrics['queries']['p50'],
+            'queries_p99': metrics['queries']['p99'],
+        }
@@ -0,0 +1,179 @@
+# ruff: noqa: ARG002, PLR6301
+
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from posts.models import (
+    CelebrityAuthor,
+    Follow,
+    Post,
+    TimelineEntry,
+    User,
+)
+from posts.timeline import TimelinePaginator
+
+
+def measure(func, repeat: int) -> tuple[float, float]:
+    """Вернуть медиану и 95-й перцентиль времени вызова в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (repeat - 1))]
+
+
+def read_feed(user, celebrities=()) -> list:
+    paginator = TimelinePaginator(
+        user.timeline.select_related('post__group', 'post__author'),
+        settings.POSTS_PER_PAGE,
+        celebrities=celebrities,
+    )
+    return list(paginator.page())
+
+
+class Command(BaseCommand):
+    help = (
+        'Замерить запись и чтение ленты подписок в режимах fan-out '
+        'при записи, при чтении и гибридном на синтетических данных '
+        'во временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--followers',
+            type=int,
+            default=5000,
+            help='подписчиков у популярного автора',
+        )
+        parser.add_argument(
+            '--following',
+            type=int,
+            default=500,
+            help='авторов в подписках у активного читателя',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=20, help='постов у каждого автора'
+        )
+        parser.add_argument(
+            '--celebrities',
+            type=int,
+            default=10,
+            help='популярных авторов в гибридном сценарии',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        with tempfile.TemporaryDirectory() as temporary:
+            test_settings = connection.settings_dict['TEST']
+            saved_name = test_settings['NAME']
+            # The live database keeps its write lock and its data, a file
+            # rather than the in-memory default measures real I/O
+            test_settings['NAME'] = str(Path(temporary) / 'benchmark.sqlite3')
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                # Feed generations bumped by new posts stay out of the
+                # site's cache
+                with override_settings(
+                    CACHES={
+                        'default': {
+                            'BACKEND': (
+                                'django.core.cache.backends.locmem.LocMemCache'
+                            ),
+                        }
+                    }
+                ):
+                    self.celebrity_author(options['followers'])
+                    self.heavy_reader(
+                        options['following'],
+                        options['posts'],
+                        options['celebrities'],
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings['NAME'] = saved_name
+
+    def make_users(self, count: int, tag: str) -> list[User]:
+        User.objects.bulk_create(
+            User(username=f'{tag}_{i}') for i in range(count)
+        )
+        return list(User.objects.filter(username__startswith=f'{tag}_'))
+
+    def report(self, label: str, func) -> None:
+        median, p95 = measure(func, self.repeat)
+        self.stdout.write(
+            f'  {label:<44} p50 {median:8.2f} ms  p95 {p95:8.2f} ms'
+        )
+
+    def celebrity_author(self, followers: int) -> None:
+        self.stdout.write(f'Автор с {followers} подписчиками:')
+        (author,) = self.make_users(1, 'celebrity')
+        readers = self.make_users(followers, 'reader')
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for reader in readers
+        )
+        create = lambda: Post.objects.create(text='пост', author=author)
+
+        self.report('публикация, fan-out при записи', create)
+        self.report(
+            'чтение ленты подписчика, fan-out при записи',
+            lambda: read_feed(readers[0]),
+        )
+        CelebrityAuthor.objects.create(author=author)
+        TimelineEntry.objects.filter(post__author=author).delete()
+        self.report('публикация, гибридный режим', create)
+        self.report(
+            'чтение ленты подписчика, гибридный режим',
+            lambda: read_feed(readers[0], [author.pk]),
+        )
+
+    def heavy_reader(self, following: int, posts: int, celebrities: int):
+        self.stdout.write(
+            f'Читатель с {following} подписками по {posts} постов:'
+        )
+        (reader,) = self.make_users(1, 'heavy')
+        authors = self.make_users(following, 'author')
+        Post.objects.bulk_create(
+            Post(text='пост', author=author)
+            for author in authors
+            for _ in range(posts)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in authors
+        )
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user=reader, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in Post.objects.filter(
+                    author__in=authors
+                ).values_list('pk', 'pub_date')
+            ),
+            batch_size=1000,
+        )
+
+        self.report(
+            'fan-out при чтении (JOIN по подпискам)',
+            lambda: list(
+                Post.objects.filter(
+                    author__following__user=reader
+                ).select_related('group', 'author')[: settings.POSTS_PER_PAGE]
+            ),
+        )
+        self.report('fan-out при записи', lambda: read_feed(reader))
+        pulled = [author.pk for author in authors[:celebrities]]
+        TimelineEntry.objects.filter(post__author__in=pulled).delete()
+        self.report(
+            f'гибридный режим, {len(pulled)} популярных авторов',
+            lambda: read_feed(reader, pulled),
+        )
@@ -0,0 +1,45 @@
+# ruff: noqa: ARG002, PLR6301
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгрузить сообщества, посты, комментарии и подписки в каталог: '
+        'по файлу JSON Lines или CSV на таблицу. Строки читаются потоком, '
+        'прерванную выгрузку можно продолжить с --resume. Картинки '
+        'постов не копируются, выгружаются только их имена.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', type=Path)
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='продолжить прерванную выгрузку в тот же каталог',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        try:
+            exported = transfer.export(
+                options['directory'],
+                file_format=options['format'],
+                resume=options['resume'],
+                batch_size=options['batch_size'],
+                progress=self.stdout.write,
+            )
+        except ValueError as error:
+            raise CommandError(error) from error
+        self.stdout.write(
+            self.style.SUCCESS(f'Выгружено строк: {sum(exported.values())}')
+        )
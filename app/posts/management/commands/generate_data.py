@@ -0,0 +1,111 @@
+# ruff: noqa: ARG002, PLR6301
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import synthetic
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполнить базу синтетическими пользователями, сообществами, '
+        'постами, комментариями и подписками для замеров на больших '
+        'объёмах. Строки вставляются пачками через bulk_create, '
+        'счётчики, ленты и поисковый индекс пересчитываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=2_000_000)
+        parser.add_argument('--follows', type=int, default=1_000_000)
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=0,
+            help='различных картинок, которые получат посты',
+        )
+        parser.add_argument(
+            '--image-share',
+            type=float,
+            default=0.2,
+            help='доля постов с картинкой',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365, help='за сколько дней посты'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='начало имён пользователей и адресов сообществ',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=synthetic.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            msg = (
+                f'Пользователи с префиксом «{prefix}» уже есть, '
+                'выберите другой --prefix'
+            )
+            raise CommandError(msg)
+        if options['images'] and not 0 < options['image_share'] <= 1:
+            msg = '--image-share должен быть от 0 до 1'
+            raise CommandError(msg)
+
+        start = time.perf_counter()
+
+        def progress(message: str) -> None:
+            self.stdout.write(
+                f'[{time.perf_counter() - start:7.1f} с] {message}'
+            )
+
+        before = self.counts()
+        synthetic.generate(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            image_share=options['image_share'],
+            days=options['days'],
+            prefix=prefix,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+        # Fresh statistics, so the query planner knows the new sizes
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        progress('статистика планировщика обновлена')
+
+        added = {
+            model: count - before[model]
+            for model, count in self.counts().items()
+        }
+        total = sum(added.values())
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                'Добавлено '
+                + ', '.join(
+                    f'{model._meta.verbose_name_plural.lower()} {count}'
+                    for model, count in added.items()
+                )
+                + f' за {elapsed:.0f} с ({total / elapsed:.0f} строк/с)'
+            )
+        )
+
+    def counts(self) -> dict:
+        return {
+            model: model.objects.count()
+            for model in (User, Group, Post, Comment, Follow, TimelineEntry)
+        }
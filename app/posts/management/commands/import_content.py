@@ -0,0 +1,42 @@
+# ruff: noqa: ARG002, PLR6301
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузить сообщества, посты, комментарии и подписки из каталога, '
+        'выгруженного export_content. Строки вставляются пачками, '
+        'в непустой базе получают новые id, авторы без учётной записи '
+        'заводятся без пароля. Прерванную загрузку можно продолжить '
+        'с --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', type=Path)
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='продолжить прерванную загрузку из того же каталога',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if not options['directory'].is_dir():
+            msg = f'Нет каталога {options["directory"]}'
+            raise CommandError(msg)
+        imported = transfer.import_(
+            options['directory'],
+            resume=options['resume'],
+            batch_size=options['batch_size'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Прочитано строк: {sum(imported.values())}')
+        )
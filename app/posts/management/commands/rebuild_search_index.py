@@ -0,0 +1,22 @@
+# ruff: noqa: ARG002
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново построить полнотекстовый индекс постов и комментариев, '
+        'например после загрузки данных в обход сигналов'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts, comments = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Проиндексировано постов {posts}, комментариев {comments}'
+            )
+        )
@@ -0,0 +1,24 @@
+# ruff: noqa: ARG002
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.timeline import reclassify
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать популярных авторов по порогу '
+        'TIMELINE_CELEBRITY_FOLLOWERS и перестроить их ленты'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            promoted, demoted = reclassify()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Порог: {settings.TIMELINE_CELEBRITY_FOLLOWERS} подписчиков. '
+                f'Повышено: {len(promoted)}, понижено: {len(demoted)}'
+            )
+        )
@@ -0,0 +1,32 @@
+# ruff: noqa: ARG002, PLR6301
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_posts, recount_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать денормализованные счётчики постов, комментариев '
+        'и подписок и исправить расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='только показать число расхождений',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            posts = recount_posts(dry_run=dry_run)
+            users = recount_users(dry_run=dry_run)
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} расхождений: постов {posts}, пользователей {users}'
+            )
+        )
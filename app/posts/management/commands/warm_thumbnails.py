@@ -0,0 +1,53 @@
+# ruff: noqa: ARG002, PLR6301
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузить в кэш метаданные миниатюр свежих постов и показать '
+        'картинки без миниатюр, а также потерянные и лишние файлы миниатюр'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=settings.THUMBNAIL_WARM_UP_POSTS,
+            help='сколько последних постов с картинками прогреть',
+        )
+        parser.add_argument(
+            '--generate',
+            action='store_true',
+            help='поставить недостающие миниатюры в очередь',
+        )
+        parser.add_argument(
+            '--audit',
+            action='store_true',
+            help='сверить файлы миниатюр с хранилищем ключей',
+        )
+
+    def handle(self, *args, **options):
+        names = thumbnails.recent_images(options['posts'])
+        loaded, missing = thumbnails.warm_up(names)
+        self.stdout.write(
+            f'Картинок {len(names)}, загружено записей {loaded}, '
+            f'без части миниатюр {len(missing)}'
+        )
+        for name in sorted(missing):
+            self.stdout.write(f'  {name}')
+            if options['generate']:
+                thumbnails.prepare(name)
+
+        if options['audit']:
+            lost, orphaned = thumbnails.audit_files()
+            self.stdout.write(f'Записей без файла: {len(lost)}')
+            for name in lost:
+                self.stdout.write(f'  {name}')
+            self.stdout.write(f'Файлов без записи: {len(orphaned)}')
+            for name in orphaned:
+                self.stdout.write(f'  {name}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
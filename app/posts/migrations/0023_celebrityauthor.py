@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0022_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CelebrityAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='celebrity', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+    ]
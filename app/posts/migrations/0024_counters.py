@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    Post.objects.update(comments_count=count_rows(Comment, 'post'))
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in User.objects.values_list('pk', flat=True)),
+        batch_size=1000,
+    )
+    UserStats.objects.update(
+        posts_count=count_rows(Post, 'author'),
+        followers_count=count_rows(Follow, 'author'),
+        following_count=count_rows(Follow, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0023_celebrityauthor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='число подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
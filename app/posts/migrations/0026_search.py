@@ -0,0 +1,31 @@
+from django.db import migrations
+
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2'"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f'CREATE VIRTUAL TABLE posts_post_search '
+                f'USING fts5(text, {TOKENIZE})',
+                'INSERT INTO posts_post_search (rowid, text) '
+                'SELECT id, text FROM posts_post',
+            ],
+            reverse_sql='DROP TABLE posts_post_search',
+        ),
+        migrations.RunSQL(
+            sql=[
+                f'CREATE VIRTUAL TABLE posts_comment_search '
+                f'USING fts5(text, post_id UNINDEXED, {TOKENIZE})',
+                'INSERT INTO posts_comment_search (rowid, text, post_id) '
+                'SELECT id, text, post_id FROM posts_comment',
+            ],
+            reverse_sql='DROP TABLE posts_comment_search',
+        ),
+    ]
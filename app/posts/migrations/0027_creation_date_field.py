@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+import posts.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_search'),
+    ]
+
+    # The columns stay the same, SQLite need not rebuild the tables
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='comment',
+                    name='created',
+                    field=posts.models.CreationDateTimeField(auto_now_add=True, verbose_name='дата публикации'),
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='pub_date',
+                    field=posts.models.CreationDateTimeField(auto_now_add=True, db_index=True, verbose_name='дата публикации'),
+                ),
+            ],
+        ),
+    ]
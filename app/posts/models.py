@@ -1,3 +1,5 @@
+from contextvars import ContextVar
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.urls import reverse
@@ -5,6 +7,21 @@ from django.urls import reverse
 User = get_user_model()
 
 
+class CreationDateTimeField(models.DateTimeField):
+    """Дата создания, как `auto_now_add`.
+
+    Внутри `bulk.explicit_dates()` новые объекты сохраняются с датами,
+    которые им уже присвоены: так массовая вставка передаёт свои.
+    """
+
+    explicit = ContextVar('explicit_creation_dates', default=False)
+
+    def pre_save(self, model_instance, add):
+        if add and self.explicit.get():
+            return getattr(model_instance, self.attname)
+        return super().pre_save(model_instance, add)
+
+
 class Group(models.Model):
     title = models.CharField('заголовок', max_length=200)
     slug = models.SlugField('читаемая часть URL', unique=True)
@@ -23,7 +40,7 @@ class Group(models.Model):
 
 class Post(models.Model):
     text = models.TextField('текст поста')
-    pub_date = models.DateTimeField(
+    pub_date = CreationDateTimeField(
         'дата публикации',
         auto_now_add=True,
         db_index=True,
@@ -47,9 +64,22 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'число комментариев', default=0, editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                name='post_author_pub_date_idx',
+                fields=['author', 'pub_date'],
+            ),
+            models.Index(
+                name='post_group_pub_date_idx',
+                fields=['group', 'pub_date'],
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -74,9 +104,15 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField('текст', help_text='Текст нового комментария')
-    created = models.DateTimeField('дата публикации', auto_now_add=True)
+    created = CreationDateTimeField('дата публикации', auto_now_add=True)
 
     class Meta:
+        indexes = (
+            models.Index(
+                name='comment_post_created_idx',
+                fields=['post', 'created'],
+            ),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -84,6 +120,30 @@ class Comment(models.Model):
         return self.text[:15]
 
 
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые при записи постов и подписок."""
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='пользователь',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -117,3 +177,60 @@ class Follow(models.Model):
             f'{self.user.username} -> '  # type: ignore
             f'{self.author.username}'  # type: ignore
         )
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок читателя."""
+
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        verbose_name='читатель',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='пост',
+        on_delete=models.CASCADE,
+    )
+    # Copy of post.pub_date, so a feed page is read from one index
+    pub_date = models.DateTimeField('дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                name='unique_timeline_entry',
+                fields=['user', 'post'],
+            ),
+        )
+        indexes = (
+            models.Index(
+                name='timeline_user_pub_date_idx',
+                fields=['user', 'pub_date', 'post'],
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'{self.user} <- {self.post}'
+
+
+class CelebrityAuthor(models.Model):
+    """Автор, чьи посты подмешиваются в ленты при чтении, а не при записи."""
+
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='celebrity',
+        verbose_name='автор',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        return str(self.author)
@@ -0,0 +1,173 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+
+
+class InvalidCursorError(InvalidPage):
+    pass
+
+
+def encode_cursor(values, number: int, *, reverse: bool = False) -> str:
+    """Упаковать значения ключа сортировки в непрозрачный токен для URL."""
+    payload = {'v': [str(value) for value in values], 'n': number}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(token: str) -> tuple[list[str], int, bool]:
+    """Распаковать токен курсора в (значения ключа, номер страницы, назад?)."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values, number = list(payload['v']), int(payload['n'])
+        reverse = bool(payload.get('r'))
+    except (ValueError, TypeError, KeyError, AttributeError, binascii.Error):
+        msg = 'Некорректный курсор'
+        raise InvalidCursorError(msg) from None
+    return values, number, reverse
+
+
+def seek_filter(ordering, values) -> Q:
+    """Условие «строго после values» для лексикографического порядка."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.removeprefix('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    # Non-strict bound on the leading column lets the database seek
+    # the index instead of evaluating the OR for every row.
+    name = ordering[0].removeprefix('-')
+    lookup = 'lte' if ordering[0].startswith('-') else 'gte'
+    return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+
+def reverse_ordering(ordering) -> tuple[str, ...]:
+    return tuple(
+        field.removeprefix('-') if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу сортировки вместо номера страницы.
+
+    Страница выбирается условием на ключ (по умолчанию `(pub_date, id)`)
+    крайней записи соседней страницы, без OFFSET и COUNT(*), поэтому
+    глубокие страницы стоят столько же, сколько первая.
+    Общее число записей считается только по требованию
+    либо берётся из заранее известного `count`.
+    """
+
+    def __init__(
+        self, object_list, per_page, ordering=('-pub_date', '-pk'), count=None
+    ):
+        self.ordering = tuple(ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+        self._count = count
+        self._num_pages = 1
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = self.object_list.count()
+        return self._count
+
+    @property
+    def num_pages(self):
+        """Число страниц, известное по уже загруженной странице."""
+        return self._num_pages
+
+    def fetch(self, values, *, reverse: bool) -> list:
+        """Загрузить до per_page + 1 записей после значений ключа."""
+        ordering = (
+            reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(seek_filter(ordering, values))
+        return list(queryset[: self.per_page + 1])
+
+    def key(self, obj) -> list:
+        return [
+            getattr(obj, field.removeprefix('-')) for field in self.ordering
+        ]
+
+    def parse_values(self, values) -> list:
+        """Привести строки из курсора к типам полей ключа."""
+        if len(values) != len(self.ordering):
+            msg = 'Курсор не соответствует порядку сортировки'
+            raise InvalidCursorError(msg)
+        meta = self.object_list.model._meta
+        try:
+            return [
+                (meta.pk if name == 'pk' else meta.get_field(name)).to_python(
+                    value
+                )
+                for name, value in zip(
+                    (field.removeprefix('-') for field in self.ordering),
+                    values,
+                )
+            ]
+        except ValidationError:
+            msg = 'Некорректный курсор'
+            raise InvalidCursorError(msg) from None
+
+    def page(self, cursor=None) -> Page:
+        """Вернуть страницу, примыкающую к позиции курсора."""
+        if not cursor:
+            return self._build_page(self.fetch(None, reverse=False), 1)
+        values, number, reverse = decode_cursor(cursor)
+        values = self.parse_values(values)
+        if not reverse:
+            number = max(number, 2)
+        rows = self.fetch(values, reverse=reverse)
+        if not rows:
+            return self.page()
+        return self._build_page(rows, number, reverse=reverse)
+
+    def get_page(self, cursor=None) -> Page:
+        """Вернуть страницу по курсору, а при некорректном курсоре — первую."""
+        try:
+            return self.page(cursor)
+        except InvalidCursorError:
+            return self.page()
+
+    def _build_page(self, rows, number, *, reverse=False) -> Page:
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+            number = max(number, 2) if has_more else 1
+        else:
+            has_previous, has_next = number > 1, has_more
+        self._num_pages = number + 1 if has_next else number
+
+        page = Page(rows, number, self)
+        page.next_cursor = (
+            encode_cursor(self.key(rows[-1]), number + 1) if has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(self.key(rows[0]), number - 1, reverse=True)
+            if has_previous
+            else None
+        )
+        return page
+
+
+class ValuesPaginator(CursorPaginator):
+    """Курсорный пагинатор по `values()`: записи страницы — словари.
+
+    Поля ключа сортировки должны быть среди выбранных.
+    """
+
+    def key(self, obj) -> list:
+        return [obj[field.removeprefix('-')] for field in self.ordering]
@@ -0,0 +1,176 @@
+import re
+
+from django.db import connection
+
+from .models import Comment, Post
+from .pagination import CursorPaginator, InvalidCursorError
+
+# Posts whose comments match rank below posts matching by their own text
+COMMENT_WEIGHT = 0.5
+MAX_TERMS = 10
+# Matches ranked from each table. FTS5 scores every match it returns, so
+# the newest ones are taken in rowid order, which stops early; a bm25
+# top-N would still score all of them
+MAX_CANDIDATES = 1000
+
+MATCHES = """
+    SELECT * FROM (
+        SELECT rowid AS post_id, bm25(posts_post_search) AS score
+        FROM posts_post_search WHERE posts_post_search MATCH %s
+        ORDER BY rowid DESC LIMIT %s
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT post_id, bm25(posts_comment_search) * %s
+        FROM posts_comment_search WHERE posts_comment_search MATCH %s
+        ORDER BY rowid DESC LIMIT %s
+    )
+"""
+
+
+def match_expression(query: str) -> str:
+    """Превратить пользовательский запрос в выражение FTS5.
+
+    Синтаксис FTS5 пользователю не доступен: каждое слово ищется как
+    префикс, все слова должны встретиться.
+    """
+    terms = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_post(post: Post) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'REPLACE INTO posts_post_search (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id: int) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM posts_post_search WHERE rowid = %s', [post_id]
+        )
+
+
+def index_comment(comment: Comment) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'REPLACE INTO posts_comment_search (rowid, text, post_id) '
+            'VALUES (%s, %s, %s)',
+            [comment.pk, comment.text, comment.post_id],
+        )
+
+
+def unindex_comment(comment_id: int) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM posts_comment_search WHERE rowid = %s', [comment_id]
+        )
+
+
+def rebuild() -> tuple[int, int]:
+    """Заново построить индекс по всем постам и комментариям.
+
+    Нужна после массовой загрузки в обход сигналов. Возвращает число
+    проиндексированных постов и комментариев.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_post_search')
+        cursor.execute(
+            'INSERT INTO posts_post_search (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+        posts = cursor.rowcount
+        cursor.execute('DELETE FROM posts_comment_search')
+        cursor.execute(
+            'INSERT INTO posts_comment_search (rowid, text, post_id) '
+            'SELECT id, text, post_id FROM posts_comment'
+        )
+        comments = cursor.rowcount
+        for table in ('posts_post_search', 'posts_comment_search'):
+            cursor.execute(
+                f"INSERT INTO {table} ({table}) VALUES ('optimize')"
+            )
+    return posts, comments
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный пагинатор результатов поиска, от самых релевантных.
+
+    Ключ страницы — пара `(релевантность, id)`, так что следующая
+    страница не пересчитывает предыдущие через OFFSET. Ранжируются
+    `MAX_CANDIDATES` самых новых совпадений среди постов и столько же
+    среди комментариев: время запроса не растёт с числом совпадений,
+    а более старые совпадения не показываются.
+    """
+
+    def __init__(self, object_list, per_page, query=''):
+        super().__init__(object_list, per_page)
+        self.expression = match_expression(query)
+
+    def _params(self) -> list:
+        return [
+            self.expression,
+            MAX_CANDIDATES,
+            COMMENT_WEIGHT,
+            self.expression,
+            MAX_CANDIDATES,
+        ]
+
+    @property
+    def count(self):
+        if self._count is None:
+            if not self.expression:
+                return 0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT COUNT(DISTINCT post_id) '
+                    f'FROM ({MATCHES}) AS matches',
+                    self._params(),
+                )
+                (self._count,) = cursor.fetchone()
+        return self._count
+
+    def fetch(self, values, *, reverse: bool) -> list:
+        if not self.expression:
+            return []
+        sql = (
+            f'SELECT post_id, MIN(score) AS rank FROM ({MATCHES}) AS matches '
+            'GROUP BY post_id'
+        )
+        params = self._params()
+        direction = 'DESC' if reverse else 'ASC'
+        if values is not None:
+            sign = '<' if reverse else '>'
+            sql += (
+                f' HAVING MIN(score) {sign} %s '
+                f'OR (MIN(score) = %s AND post_id {sign} %s)'
+            )
+            params += [values[0], values[0], values[1]]
+        sql += f' ORDER BY rank {direction}, post_id {direction} LIMIT %s'
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ranked = cursor.fetchall()
+
+        posts = self.object_list.in_bulk([post_id for post_id, _ in ranked])
+        rows = []
+        for post_id, rank in ranked:
+            # A post deleted since the match has no row to show
+            if post_id in posts:
+                post = posts[post_id]
+                post.search_rank = rank
+                rows.append(post)
+        return rows
+
+    def key(self, obj) -> list:  # noqa: PLR6301
+        return [obj.search_rank, obj.pk]
+
+    def parse_values(self, values) -> list:  # noqa: PLR6301
+        try:
+            rank, pk = values
+            return [float(rank), int(pk)]
+        except ValueError:
+            msg = 'Некорректный курсор'
+            raise InvalidCursorError(msg) from None
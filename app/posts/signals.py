@@ -0,0 +1,111 @@
+# ruff: noqa: ARG001
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, counters, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def user_renaming(instance, update_fields=None, **kwargs):
+    names = {'username', 'first_name', 'last_name'}
+    if instance.pk is None or (
+        update_fields is not None and not names & update_fields
+    ):
+        return
+    renamed = (
+        User.objects
+        .filter(pk=instance.pk)
+        .exclude(**{name: getattr(instance, name) for name in names})
+        .exists()
+    )
+    if renamed:
+        # Author names are shown on post cards in every feed
+        caching.site_changed()
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(instance, **kwargs):
+    if instance.pk is not None:
+        # A post moved to another group also leaves the old group's feed
+        previous = (
+            Post.objects
+            .filter(pk=instance.pk, group__isnull=False)
+            .exclude(group=instance.group_id)
+            .values_list('group', flat=True)
+        )
+        caching.bump(*map(caching.group_scope, previous))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(instance, created, update_fields=None, **kwargs):
+    if created:
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+    if instance.image:
+        thumbnails.prepare(instance.image.name)
+    caching.post_changed(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(instance, **kwargs):
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    search.unindex_post(instance.pk)
+    caching.post_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+    search.index_comment(instance)
+    caching.bump(caching.post_scope(instance.post_id), caching.COMMENTS)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+    search.unindex_comment(instance.pk)
+    caching.bump(caching.post_scope(instance.post_id), caching.COMMENTS)
+
+
+def followed(follow: Follow) -> None:
+    # Profiles of both users show their follow counters
+    caching.bump(
+        caching.follow_scope(follow.user_id),
+        caching.profile_scope(follow.user_id),
+        caching.profile_scope(follow.author_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(instance, created, **kwargs):
+    if created:
+        counters.change_user_stats(instance.user_id, following_count=1)
+        counters.change_user_stats(instance.author_id, followers_count=1)
+        timeline.classify(instance.author_id)
+        timeline.backfill(instance)
+        followed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    timeline.trim(instance)
+    followed(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(**kwargs):
+    caching.site_changed()
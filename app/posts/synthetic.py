@@ -0,0 +1,280 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from .bulk import BATCH_SIZE, explicit_dates, last_id, rebuild_derived
+from .models import Comment, Follow, Group, Post, User
+
+WORDS = [
+    'лето',
+    'город',
+    'море',
+    'книга',
+    'утро',
+    'вечер',
+    'дорога',
+    'дом',
+    'друг',
+    'кофе',
+    'музыка',
+    'поезд',
+    'река',
+    'лес',
+    'снег',
+    'солнце',
+    'работа',
+    'отпуск',
+    'кошка',
+    'собака',
+    'сад',
+    'окно',
+    'история',
+    'фото',
+    'рецепт',
+    'прогулка',
+    'выставка',
+    'концерт',
+    'парк',
+    'мост',
+    'небо',
+]
+FIRST_NAMES = [
+    'Анна',
+    'Иван',
+    'Мария',
+    'Пётр',
+    'Ольга',
+    'Сергей',
+    'Елена',
+    'Дмитрий',
+    'Лев',
+]
+LAST_NAMES = [
+    'Иванов',
+    'Смирнов',
+    'Кузнецов',
+    'Попов',
+    'Соколов',
+    'Лебедев',
+    'Козлов',
+]
+
+
+def power_law(count: int, exponent: float = 1.1) -> list[float]:
+    """Накопленные веса рангов 1..count для `random.choices`.
+
+    Немногие популярные элементы и длинный хвост, как у авторов,
+    сообществ и постов в настоящей соцсети.
+    """
+    return list(accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+
+def _insert(model, objects, batch_size: int, **kwargs) -> None:
+    # bulk_create() materializes its argument, so millions of rows are fed
+    # to it a batch at a time; one transaction keeps SQLite from syncing
+    # the journal after every batch
+    objects = iter(objects)
+    with transaction.atomic():
+        while batch := list(islice(objects, batch_size)):
+            model.objects.bulk_create(batch, **kwargs)
+
+
+def _new_ids(model, after: int) -> list[int]:
+    return list(
+        model.objects
+        .filter(pk__gt=after)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def color(rng: random.Random) -> tuple:
+    return tuple(rng.choices(range(256), k=3))
+
+
+def make_images(count: int, prefix: str, rng: random.Random) -> list[str]:
+    """Нарисовать картинки для постов и вернуть их имена в хранилище."""
+    storage = Post._meta.get_field('image').storage
+    names = []
+    for number in range(count):
+        image = Image.new('RGB', (1280, 720), color(rng))
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x, y = rng.randrange(1280), rng.randrange(720)
+            draw.ellipse(
+                (x, y, x + rng.randrange(50, 400), y + rng.randrange(50, 400)),
+                fill=color(rng),
+            )
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=85)
+        names.append(
+            storage.save(
+                f'posts/{prefix}{number}.jpg', ContentFile(buffer.getvalue())
+            )
+        )
+    return names
+
+
+def _users(
+    count: int, prefix: str, rng: random.Random, batch_size: int
+) -> list[int]:
+    first_user = last_id(User)
+    password = make_password(None)
+    _insert(
+        User,
+        (
+            User(
+                username=f'{prefix}{number}',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for number in range(count)
+        ),
+        batch_size,
+    )
+    user_ids = _new_ids(User, first_user)
+    # Popularity is not tied to the registration order
+    rng.shuffle(user_ids)
+    return user_ids
+
+
+def _groups(
+    count: int, prefix: str, rng: random.Random, batch_size: int
+) -> list[int]:
+    first_group = last_id(Group)
+    _insert(
+        Group,
+        (
+            Group(
+                title=f'Сообщество {number}',
+                slug=f'{prefix}-{number}',
+                description=sentence(rng, 12),
+            )
+            for number in range(count)
+        ),
+        batch_size,
+    )
+    return _new_ids(Group, first_group)
+
+
+def _follows(
+    count: int,
+    user_ids: list[int],
+    popularity: list[float],
+    rng: random.Random,
+    batch_size: int,
+) -> None:
+    # How widely an author is read does not follow from how much they
+    # write; tying the two makes timelines grow with their product
+    audience = user_ids.copy()
+    rng.shuffle(audience)
+
+    def make_follows():
+        # Readers subscribe to popular authors much more often
+        for _ in range(count):
+            user = rng.choice(user_ids)
+            (author,) = rng.choices(audience, cum_weights=popularity)
+            if user != author:
+                yield Follow(user_id=user, author_id=author)
+
+    _insert(Follow, make_follows(), batch_size, ignore_conflicts=True)
+
+
+def generate(  # noqa: PLR0913
+    *,
+    users: int,
+    groups: int,
+    posts: int,
+    comments: int,
+    follows: int,
+    images: int = 0,
+    image_share: float = 0.2,
+    days: int = 365,
+    prefix: str = 'synthetic',
+    seed: int = 0,
+    batch_size: int = BATCH_SIZE,
+    progress=None,
+) -> None:
+    """Наполнить базу синтетическими пользователями, постами и подписками.
+
+    Строки вставляются через `bulk_create` пачками, в обход сигналов;
+    счётчики, ленты, популярные авторы и поисковый индекс
+    пересчитываются в конце. Авторство, подписки, сообщества
+    и комментарии распределены по степенному закону. Посты равномерно
+    разложены по последним `days` дням.
+    """
+    rng = random.Random(seed)
+    report = progress or (lambda _: None)
+    now = timezone.now()
+
+    user_ids = _users(users, prefix, rng, batch_size)
+    popularity = power_law(len(user_ids))
+    report(f'пользователей: {len(user_ids)}')
+
+    group_ids = _groups(groups, prefix, rng, batch_size)
+    group_weights = power_law(len(group_ids))
+    report(f'сообществ: {len(group_ids)}')
+
+    image_names = make_images(images, prefix, rng)
+    start = now - timedelta(days=days)
+    step = timedelta(days=days) / max(posts, 1)
+
+    def make_post(number: int) -> Post:
+        (author,) = rng.choices(user_ids, cum_weights=popularity)
+        group = None
+        if group_ids and rng.random() < 0.7:
+            (group,) = rng.choices(group_ids, cum_weights=group_weights)
+        image = ''
+        if image_names and rng.random() < image_share:
+            image = rng.choice(image_names)
+        return Post(
+            text=sentence(rng, rng.randint(5, 60)),
+            author_id=author,
+            group_id=group,
+            image=image,
+            pub_date=start + step * number,
+        )
+
+    first_post = last_id(Post)
+    with explicit_dates():
+        _insert(Post, map(make_post, range(posts)), batch_size)
+    post_ids = _new_ids(Post, first_post)
+    report(f'постов: {len(post_ids)}')
+
+    # Newer posts are discussed more
+    post_weights = power_law(len(post_ids))
+
+    def make_comment(_) -> Comment:
+        (index,) = rng.choices(
+            range(len(post_ids) - 1, -1, -1), cum_weights=post_weights
+        )
+        (author,) = rng.choices(user_ids, cum_weights=popularity)
+        return Comment(
+            post_id=post_ids[index],
+            author_id=author,
+            text=sentence(rng, rng.randint(3, 25)),
+            created=min(start + step * index + timedelta(hours=1), now),
+        )
+
+    if post_ids:
+        with explicit_dates():
+            _insert(Comment, map(make_comment, range(comments)), batch_size)
+    report(f'комментариев: {comments if post_ids else 0}')
+
+    if len(user_ids) > 1:
+        _follows(follows, user_ids, popularity, rng, batch_size)
+    report('подписки созданы')
+
+    rebuild_derived(report)
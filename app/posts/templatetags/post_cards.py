@@ -0,0 +1,39 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from ..caching import card_key
+from ..thumbnails import collect_deferred, warm_up
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, *, show_group=False, show_author=False):
+    """Вернуть отрисованные карточки постов, забрав готовые из кэша разом."""
+    flags = {'show_group': show_group, 'show_author': show_author}
+    posts_by_key = {
+        card_key(post, show_group, show_author): post for post in posts
+    }
+    cards = cache.get_many(posts_by_key)
+    card_template = get_template('posts/includes/post.html')
+    # Thumbnails of all cards to render are looked up in one query
+    warm_up(
+        post.image.name
+        for key, post in posts_by_key.items()
+        if key not in cards and post.image
+    )
+    rendered = {}
+    for key, post in posts_by_key.items():
+        if key in cards:
+            continue
+        with collect_deferred() as deferred:
+            cards[key] = card_template.render({'post': post, **flags})
+        # A card showing the original in place of a pending thumbnail
+        # is rendered again next time
+        if not deferred:
+            rendered[key] = cards[key]
+    cache.set_many(rendered, timeout=settings.POST_CARD_CACHE_TIMEOUT)
+    return [mark_safe(cards[key]) for key in posts_by_key]
@@ -0,0 +1,59 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from sorl.thumbnail import get_thumbnail
+
+from ..thumbnails import CARD_WIDTHS, card_variants, warm_up
+
+register = template.Library()
+
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp'}
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', css_class='card-img my-2'):
+    """Вывести `<picture>` с вариантами картинки поста по ширине и формату.
+
+    Браузер сам выбирает AVIF или WebP и подходящую ширину, остальным
+    достаётся JPEG. Ещё не построенные варианты пропускаются, а пока
+    нет ни одного, показывается оригинал.
+    """
+    if not image:
+        return ''
+    warm_up([image.name])
+    srcsets = {}
+    for image_format, width, geometry, options in card_variants():
+        thumbnail = get_thumbnail(image, geometry, **options)
+        if thumbnail.name != image.name:
+            srcsets.setdefault(image_format, []).append((thumbnail.url, width))
+
+    jpegs = srcsets.pop('JPEG', [])
+    default_width = CARD_WIDTHS[len(CARD_WIDTHS) // 2]
+    src = next(
+        (url for url, width in jpegs if width == default_width), image.url
+    )
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[image_format], _srcset(variants), sizes)
+            for image_format, variants in srcsets.items()
+        ),
+    )
+    if jpegs:
+        img = format_html(
+            '<img class="{}" src="{}" srcset="{}" sizes="{}" alt=""'
+            ' loading="lazy">',
+            css_class,
+            src,
+            _srcset(jpegs),
+            sizes,
+        )
+    else:
+        img = format_html(
+            '<img class="{}" src="{}" alt="" loading="lazy">', css_class, src
+        )
+    return format_html('<picture>{}{}</picture>', sources, img)
+
+
+def _srcset(variants) -> str:
+    return ', '.join(f'{url} {width}w' for url, width in variants)
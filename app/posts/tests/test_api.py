@@ -0,0 +1,197 @@
+# ruff: noqa: PLR6301
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import synthetic
+from ..models import Comment, Follow, Group, Post, User
+from ..timeline import TimelinePaginator
+
+
+@override_settings(POSTS_PER_PAGE=7, COMMENTS_PER_PAGE=5, GROUPS_PER_PAGE=2)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        synthetic.generate(
+            users=15, groups=3, posts=40, comments=60, follows=40
+        )
+        cls.post = Post.objects.order_by('pk').first()
+        cls.reader = User.objects.filter(timeline__isnull=False).first()
+
+    def setUp(self):
+        cache.clear()
+
+    def collect(self, url: str) -> list:
+        """Пройти все страницы по ссылкам `next`."""
+        items = []
+        while url:
+            data = self.client.get(url).json()
+            items += data['results']
+            url = data['next']
+        return items
+
+    def test_feeds_cover_all_posts_in_order(self):
+        feeds = {
+            reverse('api:posts'): Post.objects.all(),
+            reverse(
+                'api:group_posts', args=[Group.objects.first().slug]
+            ): Post.objects.filter(group=Group.objects.first()),
+            reverse(
+                'api:profile_posts', args=[self.post.author.username]
+            ): Post.objects.filter(author=self.post.author),
+        }
+        for url, posts in feeds.items():
+            with self.subTest(url=url):
+                items = self.collect(url + '?fields=id')
+                self.assertEqual(
+                    [item['id'] for item in items],
+                    list(
+                        posts.order_by('-pub_date', '-pk').values_list(
+                            'pk', flat=True
+                        )
+                    ),
+                )
+
+    def test_comments_and_groups_are_paginated(self):
+        comments = self.collect(reverse('api:comments', args=[self.post.pk]))
+        self.assertEqual(
+            [comment['id'] for comment in comments],
+            list(
+                Comment.objects
+                .filter(post=self.post)
+                .order_by('created', 'pk')
+                .values_list('pk', flat=True)
+            ),
+        )
+        groups = self.collect(reverse('api:groups'))
+        self.assertEqual(len(groups), Group.objects.count())
+
+    def test_fields_are_selected(self):
+        url = reverse('api:post', args=[self.post.pk])
+        self.assertEqual(
+            self.client.get(url, {'fields': 'text,author'}).json(),
+            {'text': self.post.text, 'author': self.post.author.username},
+        )
+        response = self.client.get(url, {'fields': 'text,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_profile(self):
+        author = self.post.author
+        data = self.client.get(
+            reverse('api:profile', args=[author.username])
+        ).json()
+        self.assertEqual(data['username'], author.username)
+        self.assertEqual(
+            data['posts_count'], Post.objects.filter(author=author).count()
+        )
+
+    def test_rows_are_serialized_without_models(self):
+        """Посты и комментарии не превращаются в экземпляры моделей."""
+        with (
+            mock.patch.object(Post, 'from_db') as post_from_db,
+            mock.patch.object(Comment, 'from_db') as comment_from_db,
+        ):
+            self.client.get(reverse('api:posts'))
+            self.client.get(reverse('api:post', args=[self.post.pk]))
+            self.client.get(reverse('api:comments', args=[self.post.pk]))
+        post_from_db.assert_not_called()
+        comment_from_db.assert_not_called()
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:posts'))
+        cache.clear()
+        with self.settings(POSTS_PER_PAGE=30), self.assertNumQueries(1):
+            self.client.get(reverse('api:posts'))
+
+    def test_missing_objects_and_bad_cursors(self):
+        responses = (
+            self.client.get(reverse('api:post', args=[0])),
+            self.client.get(reverse('api:comments', args=[0])),
+            self.client.get(reverse('api:profile', args=['nobody'])),
+            self.client.get(reverse('api:group_posts', args=['nothing'])),
+        )
+        for response in responses:
+            with self.subTest(url=response.request['PATH_INFO']):
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['Content-Type'], 'application/json')
+        response = self.client.get(reverse('api:posts'), {'cursor': '!'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_unchanged_responses_are_not_modified(self):
+        url = reverse('api:posts')
+        response = self.client.get(url)
+        self.assertNotIn('csrftoken', response.cookies)
+        etag = response['ETag']
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый пост', author=self.post.author)
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
+
+    @override_settings(SHARED_CACHE=True)
+    def test_comments_change_post_list_validators(self):
+        """Новый комментарий меняет число комментариев в списках постов."""
+        post = Post.objects.order_by('-pub_date', '-pk').first()
+        urls = [
+            reverse('api:posts'),
+            reverse('api:profile_posts', args=[post.author.username]),
+        ]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        Comment.objects.create(post=post, author=self.reader, text='Ещё')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, headers={'if-none-match': etags[url]}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['results'][0]['comments_count'],
+                    Post.objects.get(pk=post.pk).comments_count,
+                )
+
+    def test_follow_feed(self):
+        url = reverse('api:follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        items = self.collect(url + '?fields=id')
+        self.assertTrue(items)
+        self.assertEqual(
+            [item['id'] for item in items],
+            list(
+                Post.objects
+                .filter(
+                    author__in=Follow.objects.filter(user=self.reader).values(
+                        'author'
+                    )
+                )
+                .order_by('-pub_date', '-pk')
+                .values_list('pk', flat=True)
+            ),
+        )
+
+    def test_follow_feed_skips_posts_deleted_meanwhile(self):
+        """Пост, удалённый после выбора страницы, пропускается."""
+        self.client.force_login(self.reader)
+        url = reverse('api:follow')
+        first = self.client.get(url).json()['results']
+        page = TimelinePaginator.page
+
+        def page_then_delete(paginator, cursor):
+            found = page(paginator, cursor)
+            Post.objects.filter(pk=found.object_list[0].pk).delete()
+            return found
+
+        cache.clear()
+        with mock.patch.object(TimelinePaginator, 'page', page_then_delete):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], first[1:])
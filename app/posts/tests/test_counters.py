@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+def stats(user) -> UserStats:
+    return UserStats.objects.get(user=user)
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')  # type: ignore
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(CounterTests.user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        self.assertEqual(stats(CounterTests.author).posts_count, 1)
+
+        self.client.post(
+            reverse('posts:add_comment', args=[CounterTests.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        CounterTests.post.refresh_from_db()
+        self.assertEqual(CounterTests.post.comments_count, 1)
+
+        self.client.get(
+            reverse('posts:profile_follow', args=[CounterTests.author])
+        )
+        self.assertEqual(stats(CounterTests.author).followers_count, 1)
+        self.assertEqual(stats(CounterTests.user).following_count, 1)
+
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[CounterTests.author])
+        )
+        Comment.objects.all().delete()
+        Post.objects.create(text='Ещё пост', author=CounterTests.author)
+        Post.objects.filter(pk=CounterTests.post.pk).delete()
+        author_stats = stats(CounterTests.author)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(stats(CounterTests.user).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда пересчёта исправляет расходящиеся и пропавшие счётчики."""
+        Follow.objects.create(
+            user=CounterTests.user, author=CounterTests.author
+        )
+        Comment.objects.create(
+            text='Комментарий',
+            author=CounterTests.user,
+            post=CounterTests.post,
+        )
+        Post.objects.update(comments_count=5)
+        UserStats.objects.filter(user=CounterTests.author).update(
+            posts_count=7, followers_count=0
+        )
+        UserStats.objects.filter(user=CounterTests.user).delete()
+
+        out = StringIO()
+        call_command('recount_counters', '--dry-run', stdout=out)
+        self.assertIn('постов 1, пользователей 2', out.getvalue())
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+
+        call_command('recount_counters', stdout=StringIO())
+        CounterTests.post.refresh_from_db()
+        self.assertEqual(CounterTests.post.comments_count, 1)
+        author_stats = stats(CounterTests.author)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(stats(CounterTests.user).following_count, 1)
+
+    def test_profile_renders_count_without_aggregate(self):
+        """Профиль выводит число постов из счётчика, без COUNT(*)."""
+        url = reverse('posts:profile', args=[CounterTests.author])
+        cache.clear()
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
@@ -1,3 +1,6 @@
+# ruff: noqa: PLR6301
+
+import io
 import shutil
 import tempfile
 
@@ -6,7 +9,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db.models.fields.files import ImageFieldFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from ..forms import PostForm
 from ..models import Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -114,3 +119,37 @@ class PostFormTests(TestCase):
         comments = PostFormTests.post.comments.all()
         self.assertEqual(comments.count(), 1)
         self.assertEqual(comments[0].text, form_data['text'])
+
+    def photo(self, size=(400, 300), image_format='JPEG', name='photo.jpg'):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        exif[0x0112] = 6  # Rotated 90° clockwise
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, image_format, exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def clean_image(self, upload):
+        form = PostForm(data={'text': 'Пост'}, files={'image': upload})
+        form.is_valid()
+        return form
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_uploaded_image_is_normalized(self):
+        """Картинка уменьшается, поворачивается и теряет EXIF."""
+        form = self.clean_image(self.photo())
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (75, 100))
+        self.assertFalse(image.getexif())
+        self.assertEqual(form.cleaned_data['image'].name, 'photo.jpg')
+
+        form = self.clean_image(
+            self.photo(image_format='TIFF', name='scan.tiff')
+        )
+        self.assertEqual(form.cleaned_data['image'].name, 'scan.jpg')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100_000)
+    def test_oversized_image_is_rejected(self):
+        """Слишком большие по числу пикселей картинки не принимаются."""
+        form = self.clean_image(self.photo(size=(1000, 1000)))
+        self.assertIn('image', form.errors)
+        self.assertTrue(form.has_error('image', 'too_many_pixels'))
@@ -0,0 +1,84 @@
+from django.db.models import Count
+from django.test import TestCase
+from django.urls import reverse
+
+from core import testing
+
+from .. import synthetic
+from ..models import Group, Post, User
+
+
+class PostsQueryBudgetTests(testing.QueryBudgetMixin, TestCase):
+    def requests(self) -> dict:
+        reader = self.most_active_user()
+        author = User.objects.order_by('-stats__posts_count', 'pk').first()
+        group = Group.objects.annotate(size=Count('posts')).latest('size')
+        post = Post.objects.filter(author=author).latest('comments_count')
+        other = User.objects.create_user(  # type: ignore
+            username=f'stranger_{self.size}'
+        )
+        anonymous = self.client
+        client = self.client_for(reader)
+        owner = self.client_for(author)
+
+        def follow_and_unfollow():
+            client.post(reverse('posts:profile_follow', args=[other]))
+            return client.post(reverse('posts:profile_unfollow', args=[other]))
+
+        return {
+            'index': (2, lambda: anonymous.get(reverse('posts:index'))),
+            'group_list': (
+                4,
+                lambda: anonymous.get(
+                    reverse('posts:group_list', args=[group.slug])
+                ),
+            ),
+            'profile': (
+                4,
+                lambda: anonymous.get(reverse('posts:profile', args=[author])),
+            ),
+            'search': (
+                3,
+                lambda: anonymous.get(
+                    reverse('posts:search'), {'q': synthetic.WORDS[0]}
+                ),
+            ),
+            'post_detail': (
+                4,
+                lambda: anonymous.get(
+                    reverse('posts:post_detail', args=[post.pk])
+                ),
+            ),
+            'post_comments': (
+                2,
+                lambda: anonymous.get(
+                    reverse('posts:post_comments', args=[post.pk])
+                ),
+            ),
+            'follow_index': (
+                5,
+                lambda: client.get(reverse('posts:follow_index')),
+            ),
+            'post_create': (
+                5,
+                lambda: owner.get(reverse('posts:post_create')),
+            ),
+            'post_edit': (
+                5,
+                lambda: owner.get(reverse('posts:post_edit', args=[post.pk])),
+            ),
+            'post_delete': (
+                6,
+                lambda: owner.get(
+                    reverse('posts:post_delete', args=[post.pk])
+                ),
+            ),
+            'add_comment': (
+                8,
+                lambda: client.post(
+                    reverse('posts:add_comment', args=[post.pk]),
+                    {'text': 'Комментарий'},
+                ),
+            ),
+            'profile_follow_unfollow': (24, follow_and_unfollow),
+        }
@@ -0,0 +1,92 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.by_text = Post.objects.create(
+            text='Толстой написал «Войну и мир»', author=cls.author
+        )
+        cls.by_comment = Post.objects.create(
+            text='Что почитать зимой?', author=cls.author
+        )
+        Comment.objects.create(
+            text='Конечно, толстого', author=cls.author, post=cls.by_comment
+        )
+        Post.objects.create(text='Про погоду', author=cls.author)
+
+    def search(self, query: str, **params) -> list[Post]:
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return list(response.context['page_obj'])
+
+    def test_posts_are_found_by_text_and_comments(self):
+        """Находятся посты по тексту и комментариям, по тексту — выше."""
+        self.assertEqual(
+            self.search('толст'), [SearchTests.by_text, SearchTests.by_comment]
+        )
+        self.assertEqual(self.search('ВОЙНУ мир'), [SearchTests.by_text])
+        self.assertEqual(self.search('война'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        for query in ('"', 'AND OR', 'толст*)(', ''):
+            with self.subTest(query=query):
+                self.assertIsInstance(self.search(query), list)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правки и удаления сразу отражаются в индексе."""
+        post = Post.objects.get(pk=SearchTests.by_text.pk)
+        post.text = 'Достоевский'
+        post.save()
+        self.assertEqual(self.search('достоевск'), [post])
+        self.assertEqual(self.search('войну'), [])
+        Comment.objects.filter(post=SearchTests.by_comment).delete()
+        self.assertEqual(self.search('толст'), [])
+        post.delete()
+        self.assertEqual(self.search('достоевск'), [])
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_results_are_paginated_by_cursor(self):
+        """Курсор проходит все результаты без повторов."""
+        Post.objects.bulk_create(
+            Post(text=f'снег {"снег " * i}', author=SearchTests.author)
+            for i in range(5)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        found, cursor = [], None
+        while True:
+            params = {'q': 'снег'} | ({'cursor': cursor} if cursor else {})
+            page = self.client.get(reverse('posts:search'), params).context[
+                'page_obj'
+            ]
+            found += list(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(found), 5)
+        self.assertEqual(len(set(found)), 5)
+
+    def test_only_newest_matches_are_ranked(self):
+        """Ранжируются только самые новые совпадения каждой таблицы."""
+        posts = [
+            Post.objects.create(text=f'метель {i}', author=SearchTests.author)
+            for i in range(4)
+        ]
+        with mock.patch.object(search, 'MAX_CANDIDATES', 2):
+            found = self.search('метель')
+        self.assertCountEqual(found, posts[-2:])
@@ -0,0 +1,89 @@
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import counters, synthetic
+from ..bulk import explicit_dates
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..search import SearchPaginator
+
+
+class SyntheticDataTests(TestCase):
+    def test_generated_data_is_consistent(self):
+        """Данные создаются в обход сигналов, но производные пересчитаны."""
+        with tempfile.TemporaryDirectory() as media:
+            with override_settings(MEDIA_ROOT=media):
+                synthetic.generate(
+                    users=30,
+                    groups=3,
+                    posts=200,
+                    comments=300,
+                    follows=100,
+                    images=1,
+                    image_share=0.5,
+                )
+            self.assertEqual(User.objects.count(), 30)
+            self.assertEqual(Group.objects.count(), 3)
+            self.assertEqual(Post.objects.count(), 200)
+            self.assertEqual(Comment.objects.count(), 300)
+            self.assertTrue(Post.objects.exclude(image='').exists())
+
+        self.assertEqual(counters.recount_users(dry_run=True), 0)
+        self.assertEqual(counters.recount_posts(dry_run=True), 0)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(author__following__user=follow.user).count(),
+        )
+        self.assertFalse(
+            Comment.objects.filter(created__lt=F('post__pub_date')).exists()
+        )
+        paginator = SearchPaginator(
+            Post.objects.all(), 10, query=synthetic.WORDS[0]
+        )
+        self.assertTrue(paginator.page().object_list)
+
+    def test_explicit_dates_stay_in_their_thread(self):
+        """Свои даты массовой вставки не действуют на другие потоки."""
+        past = timezone.now() - timedelta(days=1)
+        field = Post._meta.get_field('pub_date')
+        dates = []
+
+        def create():
+            dates.append(field.pre_save(Post(pub_date=past), add=True))
+
+        with explicit_dates():
+            thread = threading.Thread(target=create)
+            thread.start()
+            thread.join()
+            self.assertEqual(
+                field.pre_save(Post(pub_date=past), add=True), past
+            )
+        self.assertGreater(dates[0], past)
+        self.assertGreater(field.pre_save(Post(pub_date=past), add=True), past)
+
+    def test_power_law_favours_first_ranks(self):
+        weights = synthetic.power_law(100)
+        self.assertGreater(weights[0], weights[-1] - weights[-2])
+        self.assertGreater(weights[9], weights[-1] / 3)
+
+    def test_generate_data_command(self):
+        """Команда наполняет базу и не повторяет уже занятый префикс."""
+        options = {
+            'users': 5,
+            'groups': 1,
+            'posts': 20,
+            'comments': 10,
+            'follows': 5,
+            'stdout': StringIO(),
+        }
+        call_command('generate_data', **options)
+        self.assertIn('посты 20', options['stdout'].getvalue())
+        with self.assertRaisesMessage(CommandError, 'synthetic'):
+            call_command('generate_data', **options)
@@ -0,0 +1,74 @@
+# ruff: noqa: PLR6301
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from ..caching import card_key
+from ..models import Group, Post, User
+
+# show_group and show_author, as the template below passes them
+SHOWN = (True, True)
+
+
+class PostCardsTagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(title='Классика', slug='classics')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, posts):
+        return Template(
+            '{% load post_cards %}'
+            '{% post_cards posts show_group=True show_author=True as cards %}'
+            '{% for card in cards %}{{ card }}{% endfor %}'
+        ).render(Context({'posts': posts}))
+
+    def test_cards_are_rendered_and_cached(self):
+        """Карточки рендерятся один раз и дальше берутся из кэша."""
+        html = self.render(PostCardsTagTests.posts)
+        for post in PostCardsTagTests.posts:
+            self.assertIn(post.text, html)
+        self.assertIn('Лев Толстой', html)
+        self.assertIn('Классика', html)
+
+        first = PostCardsTagTests.posts[0]
+        cache.set(card_key(first, *SHOWN), 'из кэша')
+        self.assertIn('из кэша', self.render(PostCardsTagTests.posts))
+
+    def test_edits_and_renames_change_card_key(self):
+        """Правка поста и переименование автора или группы дают новый ключ."""
+        post = Post.objects.select_related('author', 'group').get(
+            pk=PostCardsTagTests.posts[0].pk
+        )
+        keys = {card_key(post, *SHOWN)}
+        post.text = 'Исправленный пост'
+        keys.add(card_key(post, *SHOWN))
+        post.author.first_name = 'Алексей'
+        keys.add(card_key(post, *SHOWN))
+        post.group.title = 'Русская классика'
+        keys.add(card_key(post, *SHOWN))
+        self.assertEqual(len(keys), 4)
+        self.assertIn('Алексей Толстой', self.render([post]))
+
+    def test_author_rename_refreshes_cached_feeds(self):
+        """Переименование автора сразу видно в закэшированных лентах."""
+        url = reverse('posts:group_list', args=[PostCardsTagTests.group.slug])
+        self.assertContains(self.client.get(url), 'Лев Толстой')
+        author = User.objects.get(pk=PostCardsTagTests.author.pk)
+        author.first_name = 'Алексей'
+        author.save()
+        self.assertContains(self.client.get(url), 'Алексей Толстой')
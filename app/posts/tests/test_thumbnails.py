@@ -0,0 +1,215 @@
+# ruff: noqa: PLR6301
+
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .. import caching, thumbnails
+from ..caching import card_key
+from ..models import Post, User
+from ..thumbnails import (
+    CARD_FORMATS,
+    VARIANTS,
+    audit_files,
+    supported_formats,
+    warm_up,
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xff\xff\xff\x21\xf9\x04\x00\x00'
+    b'\x00\x00\x00\x2c\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0c'
+    b'\x0a\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, name: str) -> Post:
+        return Post.objects.create(
+            text='Пост',
+            author=ThumbnailTests.author,
+            image=SimpleUploadedFile(
+                name, SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def thumbnail(self, post: Post):
+        geometry, options = VARIANTS[0]
+        return get_thumbnail(post.image, geometry, **options)
+
+    def render_image(self, post: Post) -> str:
+        return Template(
+            '{% load responsive_images %}{% responsive_image post.image %}'
+        ).render(Context({'post': post}))
+
+    def test_thumbnails_are_made_after_upload(self):
+        """Миниатюры строятся после фиксации транзакции с новым постом."""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post('ready.gif')
+        thumbnail = self.thumbnail(post)
+        self.assertNotEqual(thumbnail.name, post.image.name)
+        self.assertTrue(thumbnail.exists())
+
+    def test_feeds_are_invalidated_once_per_image(self):
+        """Ленты сбрасываются один раз, когда готовы все варианты картинки."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = self.create_post('once.gif')
+        with mock.patch.object(caching, 'post_changed') as post_changed:
+            for callback in callbacks:
+                callback()
+        post_changed.assert_called_once_with(post)
+        self.assertNotEqual(self.thumbnail(post).name, post.image.name)
+
+    def test_picture_lists_all_variants(self):
+        """Тег выводит варианты всех ширин во всех доступных форматах."""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post('variants.gif')
+        html = self.render_image(post)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertEqual(
+            '<source type="image/avif"' in html, 'AVIF' in CARD_FORMATS
+        )
+        for width in (480, 960, 1440):
+            self.assertEqual(html.count(f' {width}w'), len(CARD_FORMATS))
+        self.assertIn('.jpg 480w', html)
+        self.assertNotIn(post.image.url, html)
+
+    def test_unsupported_formats_are_dropped(self):
+        """Формат, который не умеет сохранять sorl или Pillow, пропускается."""
+        formats = {'AVIF': 50, 'WEBP': 70, 'JPEG': 80}
+        with mock.patch.dict(
+            'sorl.thumbnail.base.EXTENSIONS',
+            clear=True,
+            JPEG='jpg',
+            WEBP='webp',
+        ):
+            self.assertEqual(
+                supported_formats(formats), {'WEBP': 70, 'JPEG': 80}
+            )
+        with mock.patch.dict('PIL.Image.SAVE'):
+            Image.SAVE.pop('AVIF', None)
+            self.assertNotIn('AVIF', supported_formats(formats))
+
+    def test_pending_thumbnail_falls_back_to_original(self):
+        """Пока миниатюры нет, отдаётся оригинал, и карточка не кэшируется."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = self.create_post('pending.gif')
+            self.assertEqual(self.thumbnail(post).name, post.image.name)
+            self.assertNotIn('srcset', self.render_image(post))
+            html = Template(
+                '{% load post_cards %}{% post_cards posts as cards %}'
+                '{% for card in cards %}{{ card }}{% endfor %}'
+            ).render(Context({'posts': [post]}))
+        self.assertIn(post.image.url, html)
+        # The tag's defaults: neither the group nor the author is shown
+        hidden = (False, False)
+        self.assertIsNone(cache.get(card_key(post, *hidden)))
+        self.assertTrue(callbacks)
+
+    def test_warm_up_loads_metadata_in_bulk(self):
+        """Прогрев переносит метаданные в кэш, и отрисовка не ходит в базу."""
+        with self.captureOnCommitCallbacks(execute=True):
+            ready = self.create_post('warm.gif')
+        with self.captureOnCommitCallbacks():
+            pending = self.create_post('cold.gif')
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            loaded, missing = warm_up([ready.image.name, pending.image.name])
+        self.assertEqual(loaded, len(VARIANTS) + 1)
+        self.assertEqual(missing, {pending.image.name})
+        with self.assertNumQueries(0):
+            self.render_image(ready)
+
+    def test_audit_reports_lost_and_orphaned_files(self):
+        """Сверка находит записи без файлов и файлы без записей."""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post('audit.gif')
+        lost = self.thumbnail(post)
+        lost.storage.delete(lost.name)
+        orphan = lost.storage.save('cache/00/00/orphan.jpg', ContentFile(b''))
+
+        missing, orphaned = audit_files()
+        self.assertEqual(missing, [lost.name])
+        self.assertIn(orphan, orphaned)
+        geometry, options = VARIANTS[1]
+        kept = get_thumbnail(post.image, geometry, **options)
+        self.assertNotIn(kept.name, orphaned)
+        out = StringIO()
+        call_command('warm_thumbnails', '--audit', stdout=out)
+        self.assertIn(orphan, out.getvalue())
+
+
+# Tests make thumbnails inline; one worker keeps the shared-cache
+# in-memory database free of concurrent writers
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=1)
+class ThumbnailWorkerTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        thumbnails.wait()
+
+    def test_thumbnails_are_made_by_workers(self):
+        """Миниатюры строятся в потоках воркеров после фиксации поста."""
+        author = User.objects.create_user(username='author')  # type: ignore
+        generate = thumbnails._generate  # noqa: SLF001
+        threads = set()
+
+        def record(job):
+            threads.add(threading.current_thread().name)
+            generate(job)
+
+        with mock.patch.object(thumbnails, '_generate', record):
+            post = Post.objects.create(
+                text='Пост',
+                author=author,
+                image=SimpleUploadedFile(
+                    'worker.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+            thumbnails.wait()
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith('thumbnails') for name in threads))
+        for geometry, options in VARIANTS:
+            thumbnail = get_thumbnail(post.image, geometry, **options)
+            self.assertNotEqual(thumbnail.name, post.image.name)
+            self.assertTrue(thumbnail.exists())
@@ -0,0 +1,179 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import CelebrityAuthor, Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(  # type: ignore
+            username='reader'
+        )
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.stranger = User.objects.create_user(  # type: ignore
+            username='stranger'
+        )
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(TimelineTests.reader)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_follow_backfills_existing_posts(self):
+        """При подписке в ленту попадают уже опубликованные посты автора."""
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        self.assertEqual(list(self.feed()), [TimelineTests.old_post])
+
+    def test_new_post_is_pushed_only_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков автора."""
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=TimelineTests.reader, post=post
+            ).exists()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.stranger).exists()
+        )
+        self.assertEqual(self.feed()[0], post)
+
+    def test_unfollow_and_delete_trim_timeline(self):
+        """Отписка и удаление поста убирают записи из ленты."""
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        post.delete()
+        self.assertEqual(list(self.feed()), [TimelineTests.old_post])
+
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(len(self.feed()), 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_timeline_pages_by_cursor(self):
+        """Лента подписок листается курсором без пропусков."""
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        Post.objects.bulk_create(
+            Post(text='Пост', author=TimelineTests.author)
+            for _ in range(settings.POSTS_PER_PAGE)
+        )
+        # bulk_create doesn't send post_save, so fill the timeline by hand
+        Follow.objects.all().delete()
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        first_page = self.feed()
+        self.assertEqual(len(first_page), settings.POSTS_PER_PAGE)
+        second_page = self.feed(cursor=first_page.next_cursor)
+        self.assertEqual(list(second_page), [TimelineTests.old_post])
+        self.assertFalse(second_page.has_next())
+
+
+@override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+class HybridTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(  # type: ignore
+            username='reader'
+        )
+        cls.fan = User.objects.create_user(username='fan')  # type: ignore
+        cls.star = User.objects.create_user(username='star')  # type: ignore
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.pushed_post = Post.objects.create(
+            text='До популярности', author=cls.star
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(HybridTimelineTests.reader)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_popular_author_is_merged_on_read(self):
+        """Посты популярного автора не раскладываются, но есть в ленте."""
+        Follow.objects.create(
+            user=HybridTimelineTests.fan, author=HybridTimelineTests.star
+        )
+        self.assertTrue(
+            CelebrityAuthor.objects.filter(
+                author=HybridTimelineTests.star
+            ).exists()
+        )
+        star_post = Post.objects.create(
+            text='Пост звезды', author=HybridTimelineTests.star
+        )
+        author_post = Post.objects.create(
+            text='Обычный пост', author=HybridTimelineTests.author
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=star_post).exists())
+        self.assertEqual(
+            list(self.feed()),
+            [author_post, star_post, HybridTimelineTests.pushed_post],
+        )
+
+    def test_merged_feed_pages_without_gaps(self):
+        """Слитая лента листается курсором без пропусков и повторов."""
+        Follow.objects.create(
+            user=HybridTimelineTests.fan, author=HybridTimelineTests.star
+        )
+        for i in range(settings.POSTS_PER_PAGE):
+            author = self.star if i % 2 else self.author
+            Post.objects.create(text=f'Пост {i}', author=author)
+        expected = list(
+            Post.objects.filter(author__in=[self.star, self.author]).order_by(
+                '-pub_date', '-pk'
+            )
+        )
+        first_page = self.feed()
+        second_page = self.feed(cursor=first_page.next_cursor)
+        self.assertEqual(list(first_page) + list(second_page), expected)
+        self.assertFalse(second_page.has_next())
+        previous_page = self.feed(cursor=second_page.previous_cursor)
+        self.assertEqual(list(previous_page), list(first_page))
+
+    def test_reclassify_demotes_and_backfills(self):
+        """Команда пересчёта возвращает авторов в обычный режим."""
+        Follow.objects.create(
+            user=HybridTimelineTests.fan, author=HybridTimelineTests.star
+        )
+        star_post = Post.objects.create(
+            text='Пост звезды', author=HybridTimelineTests.star
+        )
+        with override_settings(TIMELINE_CELEBRITY_FOLLOWERS=3):
+            call_command('reclassify_authors', stdout=StringIO())
+        self.assertFalse(CelebrityAuthor.objects.exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=HybridTimelineTests.reader, post=star_post
+            ).exists()
+        )
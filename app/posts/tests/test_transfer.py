@@ -0,0 +1,153 @@
+# ruff: noqa: PLR6301
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters, synthetic, transfer
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+def snapshot() -> dict:
+    return {
+        'groups': list(Group.objects.order_by('pk').values()),
+        'posts': list(
+            Post.objects.order_by('pk').values(
+                'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+            )
+        ),
+        'comments': list(
+            Comment.objects.order_by('pk').values(
+                'pk', 'post', 'author__username', 'text', 'created'
+            )
+        ),
+        'follows': list(
+            Follow.objects.order_by('pk').values(
+                'user__username', 'author__username'
+            )
+        ),
+    }
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        synthetic.generate(
+            users=10, groups=2, posts=50, comments=80, follows=30
+        )
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def clear(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгруженное и загруженное в пустую базу совпадает с исходным."""
+        for file_format in transfer.FORMATS:
+            with self.subTest(file_format=file_format):
+                before = snapshot()
+                call_command(
+                    'export_content',
+                    self.directory / file_format,
+                    format=file_format,
+                    batch_size=7,
+                    stdout=StringIO(),
+                )
+                self.clear()
+                call_command(
+                    'import_content',
+                    self.directory / file_format,
+                    batch_size=7,
+                    stdout=StringIO(),
+                )
+                self.assertEqual(snapshot(), before)
+                self.assertFalse(User.objects.first().has_usable_password())
+                self.assertEqual(counters.recount_users(dry_run=True), 0)
+                self.assertEqual(counters.recount_posts(dry_run=True), 0)
+                self.assertTrue(TimelineEntry.objects.exists())
+
+    def interrupted(self, function, *args, after: int, **kwargs):
+        """Вызвать `function`, оборвав её после `after` пачек."""
+        save = transfer.save_progress
+        calls = []
+
+        def save_or_fail(*save_args):
+            calls.append(save_args)
+            if len(calls) > after:
+                raise KeyboardInterrupt
+            save(*save_args)
+
+        with (
+            mock.patch.object(transfer, 'save_progress', save_or_fail),
+            self.assertRaises(KeyboardInterrupt),
+        ):
+            function(*args, **kwargs)
+
+    def test_export_resumes(self):
+        """Продолжение выгрузки не теряет и не повторяет строк."""
+        for file_format in transfer.FORMATS:
+            with self.subTest(file_format=file_format):
+                whole, resumed = self.directory / 'whole', self.directory
+                transfer.export(whole, file_format=file_format, batch_size=10)
+                self.interrupted(
+                    transfer.export,
+                    resumed,
+                    file_format=file_format,
+                    batch_size=10,
+                    after=7,
+                )
+                transfer.export(
+                    resumed,
+                    file_format=file_format,
+                    batch_size=10,
+                    resume=True,
+                )
+                for name in transfer.TABLES:
+                    file = f'{name}.{file_format}'
+                    self.assertEqual(
+                        (resumed / file).read_bytes(),
+                        (whole / file).read_bytes(),
+                        file,
+                    )
+
+    def test_import_resumes(self):
+        """Продолжение загрузки начинается с пачки, на которой прервалась."""
+        before = snapshot()
+        transfer.export(self.directory, file_format='csv')
+        self.clear()
+        # Progress is saved once before the first batch
+        self.interrupted(
+            transfer.import_, self.directory, batch_size=10, after=4
+        )
+        # The third batch of posts was saved, but not recorded
+        self.assertEqual(Post.objects.count(), 30)
+        with mock.patch.object(
+            Post.objects, 'bulk_create', wraps=Post.objects.bulk_create
+        ) as bulk_create:
+            transfer.import_(self.directory, batch_size=10, resume=True)
+        self.assertEqual(bulk_create.call_count, 3)
+        self.assertEqual(snapshot(), before)
+        progress = json.loads((self.directory / transfer.PROGRESS).read_text())
+        self.assertEqual(progress['import']['files']['posts.csv']['rows'], 50)
+
+    def test_import_into_populated_database(self):
+        """В непустой базе комментарии загружаются к своим постам."""
+
+        def comments() -> list:
+            return sorted(
+                Comment.objects.values_list(
+                    'text', 'created', 'post__text', 'post__pub_date'
+                )
+            )
+
+        before = comments()
+        transfer.export(self.directory)
+        transfer.import_(self.directory)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(comments(), sorted(before * 2))
@@ -47,6 +47,8 @@ class PostURLTests(TestCase):
             URLData(url=f'/group/{self.group.slug}/'),
             URLData(url=f'/profile/{self.user.username}/'),
             URLData(url=f'/posts/{self.post.pk}/'),
+            URLData(url=f'/posts/{self.post.pk}/comments/'),
+            URLData(url='/search/?q=пост'),
             URLData(
                 url='/create/',
                 client=self.authorized_client,
@@ -1,13 +1,20 @@
+# ruff: noqa: PLR6301
+
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.forms import fields
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core import replicas
+
 from ..forms import PostForm
 from ..models import Comment, Follow, Group, Post, User
 
@@ -204,19 +211,94 @@ class PostViewTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertTrue(Post.objects.filter(pk=PostViewTests.post.pk).exists())
 
+    def test_forms_are_shown_outside_transactions(self):
+        """Страницы форм не берут блокировку записи, её берёт только POST."""
+        pages = [
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[PostViewTests.post.pk]),
+            reverse('posts:post_delete', args=[PostViewTests.post.pk]),
+        ]
+        for page in pages:
+            with (
+                self.subTest(page=page),
+                CaptureQueriesContext(connection) as queries,
+            ):
+                self.authorized_client.get(page)
+                # Inside the test's transaction atomic() makes a savepoint
+                self.assertFalse(
+                    any(
+                        query['sql'].startswith('SAVEPOINT')
+                        for query in queries
+                    )
+                )
+
+    def test_failed_edit_is_rolled_back(self):
+        """Правка поста не сохраняется, если её обработка упала."""
+        post = Post.objects.create(text='Исходный текст', author=self.user)
+        with (
+            mock.patch('posts.search.index_post', side_effect=RuntimeError),
+            self.assertRaises(RuntimeError),
+        ):
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=[post.pk]),
+                {'text': 'Новый текст'},
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исходный текст')
+
     def test_index_page_cache(self):
-        """Главная страница корректно кэшируется."""
+        """Главная страница кэшируется до изменения постов."""
         post = Post.objects.create(
             text='Новый пост',
             author=PostViewTests.user,
         )
         first_response = self.client.get(reverse('posts:index'))
-        post.delete()
-        cached_response = self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            cached_response = self.client.get(reverse('posts:index'))
         self.assertEqual(first_response.content, cached_response.content)
-        cache.clear()
+        self.assertEqual(len(queries), 0)
+
+        post.delete()
         noncached_response = self.client.get(reverse('posts:index'))
         self.assertNotEqual(first_response.content, noncached_response.content)
+        self.assertNotContains(noncached_response, 'Новый пост')
+
+    def test_feed_caches_are_invalidated_by_scope(self):
+        """Изменения сбрасывают кэш только затронутых лент."""
+        other_group = Group.objects.create(title='Группа 2', slug='slug2')
+        urls = {
+            'group': reverse('posts:group_list', args=[self.group.slug]),
+            'other_group': reverse(
+                'posts:group_list', args=[other_group.slug]
+            ),
+            'profile': reverse('posts:profile', args=[self.user.username]),
+            'other_profile': reverse(
+                'posts:profile', args=[self.user2.username]
+            ),
+        }
+        for url in urls.values():
+            self.client.get(url)
+        post = Post.objects.create(
+            text='Пост в другой группе', author=self.user, group=other_group
+        )
+        changed = {
+            name
+            for name, url in urls.items()
+            if post.text in self.client.get(url).content.decode()
+        }
+        self.assertEqual(changed, {'other_group', 'profile'})
+
+        post.group = self.group
+        post.save()
+        response = self.client.get(urls['other_group'])
+        self.assertNotContains(response, post.text)
+        self.assertContains(self.client.get(urls['group']), post.text)
+
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        self.assertContains(
+            self.client.get(urls['profile']), 'Переименованная группа'
+        )
 
     def test_user_can_subscribe_and_unsubscribe(self):
         """Юзер может подписаться на других юзеров и удалять их из подписок."""
@@ -251,6 +333,56 @@ class PostViewTests(TestCase):
         self.assertEqual(len(response.context['page_obj']), 0)
 
 
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Пост для ASGI', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            text='Комментарий для ASGI', author=cls.reader, post=cls.post
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_read_views_under_asgi(self):
+        """Ленты и страница поста отдаются асинхронными view под ASGI."""
+        await self.async_client.aforce_login(self.reader)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, self.post.text)
+        response = await self.async_client.get(urls[2])
+        self.assertTrue(response.context['following'])
+        response = await self.async_client.get(urls[3])
+        self.assertContains(response, 'Комментарий для ASGI')
+
+    @override_settings(SHARED_CACHE=True)
+    async def test_conditional_get_under_asgi(self):
+        url = reverse('posts:index')
+        response = await self.async_client.get(url)
+        response = await self.async_client.get(
+            url, headers={'if-none-match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_anonymous_is_redirected_from_follow_index(self):
+        response = await self.async_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+
 class PostsPaginatorTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -291,7 +423,208 @@ class PostsPaginatorTests(TestCase):
 
                 if total < per_page:
                     return
-                response = self.client.get(url + '?page=2')
+                response = self.client.get(url, {'cursor': posts.next_cursor})
                 posts = response.context['page_obj']
                 num_posts_on_second_page = min(total - per_page, per_page)
                 self.assertEqual(len(posts), num_posts_on_second_page)
+
+    def test_cursor_pages_cover_all_posts_in_order(self):
+        """Курсоры вперёд и назад обходят все посты без пропусков."""
+        url = reverse('posts:index')
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        seen, pages, cursor = [], [], None
+        while True:
+            page = self.client.get(url, {'cursor': cursor} if cursor else {})
+            page = page.context['page_obj']
+            pages.append([post.pk for post in page])
+            seen.extend(pages[-1])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, len(pages))
+
+        response = self.client.get(url, {'cursor': page.previous_cursor})
+        previous = response.context['page_obj']
+        self.assertEqual([post.pk for post in previous], pages[-2])
+        self.assertEqual(previous.number, len(pages) - 1)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор приводит на первую страницу."""
+        for cursor in ('garbage', 'eyJ2IjpbIngiLCIxIl0sIm4iOjJ9'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                page = response.context['page_obj']
+                self.assertEqual(page.number, 1)
+                self.assertFalse(page.has_previous())
+
+
+class PostDetailQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def count_queries(self, comments: int) -> int:
+        Comment.objects.all().delete()
+        users = User.objects.bulk_create(
+            User(username=f'commenter_{comments}_{i}') for i in range(10)
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                text='Комментарий',
+                author=users[i % len(users)],
+                post=PostDetailQueriesTests.post,
+            )
+            for i in range(comments)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                PostDetailQueriesTests.post.get_absolute_url()
+            )
+        self.assertEqual(
+            len(response.context['comments']),
+            min(comments, settings.COMMENTS_PER_PAGE),
+        )
+        return len(queries)
+
+    def test_post_detail_query_count_is_constant(self):
+        """Число запросов страницы поста не зависит от числа комментариев."""
+        few = self.count_queries(1)
+        self.assertLessEqual(few, 3)
+        self.assertEqual(self.count_queries(2000), few)
+
+    def test_comments_are_paginated_with_fragments(self):
+        """Комментарии выводятся порциями, следующая отдаётся фрагментом."""
+        per_page = settings.COMMENTS_PER_PAGE
+        comments = Comment.objects.bulk_create(
+            Comment(
+                text=f'Комментарий {i}',
+                author=PostDetailQueriesTests.author,
+                post=PostDetailQueriesTests.post,
+            )
+            for i in range(per_page + 1)
+        )
+        response = self.client.get(
+            PostDetailQueriesTests.post.get_absolute_url()
+        )
+        first_page = response.context['comments']
+        self.assertEqual(list(first_page), comments[:per_page])
+
+        response = self.client.get(
+            reverse(
+                'posts:post_comments', args=[PostDetailQueriesTests.post.pk]
+            ),
+            {'cursor': first_page.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(list(response.context['comments']), comments[-1:])
+        self.assertContains(response, f'Комментарий {per_page}')
+        self.assertNotContains(response, 'data-fragment-url')
+
+
+@override_settings(SHARED_CACHE=True)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')  # type: ignore
+        cls.author = User.objects.create_user(  # type: ignore
+            username='author'
+        )
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(ConditionalGetTests.user)
+
+    def revalidate(self, url: str, response):
+        return self.client.get(
+            url, headers={'If-None-Match': response['ETag']}
+        )
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Повторный запрос неизменённой страницы получает 304."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[ConditionalGetTests.author]),
+            ConditionalGetTests.post.get_absolute_url(),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with CaptureQueriesContext(connection) as queries:
+                    repeated = self.revalidate(url, response)
+                self.assertEqual(repeated.status_code, 304)
+                # Session, user and at most one lookup of the page's object
+                self.assertLessEqual(len(queries), 3)
+
+    def test_writes_change_validators(self):
+        """Новые посты, комментарии и подписки меняют валидаторы страниц."""
+        index = reverse('posts:index')
+        profile = reverse('posts:profile', args=[ConditionalGetTests.author])
+        detail = ConditionalGetTests.post.get_absolute_url()
+        responses = {url: self.client.get(url) for url in (index, profile)}
+        responses[detail] = self.client.get(detail)
+
+        Post.objects.create(text='Новый пост', author=ConditionalGetTests.user)
+        self.assertEqual(
+            self.revalidate(index, responses[index]).status_code, 200
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=[ConditionalGetTests.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertEqual(
+            self.revalidate(detail, responses[detail]).status_code, 200
+        )
+        self.client.get(
+            reverse('posts:profile_follow', args=[ConditionalGetTests.author])
+        )
+        self.assertEqual(
+            self.revalidate(profile, responses[profile]).status_code, 200
+        )
+
+    def test_replica_pages_are_not_cached(self):
+        """Страница с реплики не кэшируется и не получает валидаторов."""
+        url = reverse('posts:index')
+        with mock.patch.object(
+            replicas, 'serving_replica', return_value='replica'
+        ):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.context['feed_cache_timeout'], 0)
+        self.assertIn('ETag', self.client.get(url))
+
+    def test_private_cache_gives_no_validators(self):
+        """Без общего кэша поколения не видят записей других процессов."""
+        url = reverse('posts:index')
+        with self.settings(SHARED_CACHE=False):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_other_users_get_their_own_page(self):
+        """Валидатор одного пользователя не подходит другому."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.client.logout()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
@@ -0,0 +1,304 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Post images are cropped to 960x339 in every width; browsers pick
+# the width from srcset and the first format they support
+CARD_WIDTHS = (480, 960, 1440)
+CARD_RATIO = 339 / 960
+
+
+def supported_formats(formats: dict) -> dict:
+    """Оставить форматы, которые умеют сохранять и Pillow, и sorl.
+
+    AVIF появился в sorl-thumbnail 13 и есть не в каждой сборке Pillow.
+    """
+    Image.init()
+    return {
+        image_format: quality
+        for image_format, quality in formats.items()
+        if image_format in EXTENSIONS and image_format in Image.SAVE
+    }
+
+
+CARD_FORMATS = supported_formats({'AVIF': 50, 'WEBP': 70, 'JPEG': 80})
+
+
+def card_variants():
+    """Перебрать (формат, ширина, геометрия, опции) вариантов картинки поста."""
+    for image_format, quality in CARD_FORMATS.items():
+        for width in CARD_WIDTHS:
+            geometry = f'{width}x{round(width * CARD_RATIO)}'
+            options = {
+                'crop': 'center',
+                'upscale': True,
+                'format': image_format,
+                'quality': quality,
+            }
+            yield image_format, width, geometry, options
+
+
+# Thumbnails the templates ask for; they are made right after an upload
+VARIANTS = tuple(
+    (geometry, options) for _, _, geometry, options in card_variants()
+)
+
+_generating = ContextVar('generating_thumbnails', default=False)
+_deferred = ContextVar('deferred_thumbnails', default=None)
+_pending = set()
+_lock = threading.Lock()
+_executor = None
+# Keeps the number of bound parameters well under SQLite's limit
+CHUNK_SIZE = 500
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который не рисует миниатюры в запросе.
+
+    Готовая миниатюра берётся из хранилища ключей sorl, иначе её
+    построение ставится в очередь фонового воркера, а шаблон пока
+    получает исходное изображение.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if _generating.get() or not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source = ImageFile(file_)
+        thumbnail = self.thumbnail_file(source, geometry_string, options)
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        schedule(source.name, geometry_string, options)
+        names = _deferred.get()
+        if names is not None:
+            names.append(thumbnail.name)
+        return source
+
+    def thumbnail_file(self, source, geometry_string, options) -> ImageFile:
+        """Файл, под которым `get_thumbnail` сохранит миниатюру."""
+        return ImageFile(
+            self._get_thumbnail_filename(
+                source, geometry_string, self._full_options(source, options)
+            ),
+            default.storage,
+        )
+
+    def _full_options(self, source, options) -> dict:
+        """Дополнить опции так же, как `get_thumbnail` перед выбором имени."""
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+
+@contextmanager
+def collect_deferred():
+    """Собрать имена миниатюр, вместо которых отдан оригинал.
+
+    Разметку с такими подменами не стоит кэшировать надолго.
+    """
+    names = []
+    token = _deferred.set(names)
+    try:
+        yield names
+    finally:
+        _deferred.reset(token)
+
+
+def prepare(name: str) -> None:
+    """Поставить в очередь все миниатюры загруженного изображения."""
+    jobs = [_job(name, geometry, options) for geometry, options in VARIANTS]
+    transaction.on_commit(lambda: _submit(jobs))
+
+
+def schedule(name: str, geometry: str, options: dict) -> None:
+    job = _job(name, geometry, options)
+    transaction.on_commit(lambda: _submit([job]))
+
+
+def _job(name: str, geometry: str, options: dict) -> tuple:
+    return name, geometry, tuple(sorted(options.items()))
+
+
+def _submit(jobs: list) -> None:
+    global _executor  # noqa: PLW0603
+    # All variants of an image are pending before the first one is done
+    with _lock:
+        jobs = [job for job in jobs if job not in _pending]
+        _pending.update(jobs)
+    if not settings.THUMBNAIL_WORKERS:
+        for job in jobs:
+            _generate(job)
+        return
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+        for job in jobs:
+            _executor.submit(_run_in_thread, job)
+
+
+def wait() -> None:
+    """Дождаться миниатюр, поставленных в очередь фоновым воркерам."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _run_in_thread(job) -> None:
+    try:
+        _generate(job)
+    finally:
+        connections.close_all()
+
+
+def _generate(job) -> None:
+    name, geometry, options = job
+    token = _generating.set(True)
+    try:
+        default.backend.get_thumbnail(name, geometry, **dict(options))
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', name)
+    finally:
+        _generating.reset(token)
+        with _lock:
+            _pending.discard(job)
+            done = all(pending[0] != name for pending in _pending)
+    if done:
+        _image_ready(name)
+
+
+def _image_ready(name: str) -> None:
+    # Feeds and pages rendered meanwhile show the original image
+    try:
+        for post in Post.objects.filter(image=name):
+            caching.post_changed(post)
+    except Exception:
+        logger.exception('Не удалось сбросить ленты с картинкой %s', name)
+
+
+def recent_images(count: int) -> list[str]:
+    return list(
+        Post.objects
+        .exclude(image='')
+        .order_by('-pub_date')
+        .values_list('image', flat=True)[:count]
+    )
+
+
+def warm_up(names) -> tuple[int, set[str]]:
+    """Перенести из базы в кэш метаданные картинок и их миниатюр.
+
+    Записи хранилища ключей sorl читаются одним запросом на пачку вместо
+    запроса на каждую миниатюру при первой отрисовке; отсутствующие
+    кэшируются как пустые, как это делает sorl. Возвращает число
+    загруженных записей и картинки, у которых не хватает миниатюр.
+    """
+    storage = Post._meta.get_field('image').storage
+    keys, sources = [], {}
+    for name in dict.fromkeys(names):
+        source = ImageFile(name, storage)
+        keys.append(add_prefix(source.key))
+        for geometry, options in VARIANTS:
+            thumbnail = default.backend.thumbnail_file(
+                source, geometry, options
+            )
+            key = add_prefix(thumbnail.key)
+            keys.append(key)
+            sources[key] = name
+
+    kv_cache = default.kvstore.cache
+    cached = kv_cache.get_many(keys)
+    absent = [key for key in keys if key not in cached]
+    stored = {}
+    for start in range(0, len(absent), CHUNK_SIZE):
+        stored.update(
+            KVStore.objects.filter(
+                key__in=absent[start : start + CHUNK_SIZE]
+            ).values_list('key', 'value')
+        )
+    if absent:
+        kv_cache.set_many(
+            {**dict.fromkeys(absent, EMPTY_VALUE), **stored},
+            timeout=sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+    # sorl caches a failed lookup as EMPTY_VALUE
+    missing = {
+        sources[key]
+        for key in sources
+        if cached.get(key, stored.get(key, EMPTY_VALUE)) is EMPTY_VALUE
+    }
+    return len(stored), missing
+
+
+def warm_up_on_start() -> None:
+    """Прогреть метаданные миниатюр свежих постов при запуске сервера."""
+    if not settings.THUMBNAIL_WARM_UP_POSTS:
+        return
+    try:
+        warm_up(recent_images(settings.THUMBNAIL_WARM_UP_POSTS))
+    except Exception:
+        # A cold cache is no reason for the server not to start
+        logger.exception('Не удалось прогреть кэш миниатюр')
+    finally:
+        # The connection must not be inherited by forked workers
+        connections.close_all()
+
+
+def audit_files() -> tuple[list[str], list[str]]:
+    """Сверить файлы миниатюр с хранилищем ключей sorl.
+
+    Возвращает миниатюры, записанные в хранилище без файла,
+    и файлы миниатюр, о которых хранилище не знает.
+    """
+    prefix = sorl_settings.THUMBNAIL_PREFIX
+    known = {
+        deserialize_image_file(value).name
+        for value in KVStore.objects.filter(
+            key__startswith=add_prefix('')
+        ).values_list('value', flat=True)
+    }
+    files = set(_walk(default.storage, prefix.rstrip('/')))
+    missing = sorted(
+        name for name in known if name.startswith(prefix) and name not in files
+    )
+    return missing, sorted(files - known)
+
+
+def _walk(storage, path: str):
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield f'{path}/{name}'
+    for directory in directories:
+        yield from _walk(storage, f'{path}/{directory}')
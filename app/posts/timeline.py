@@ -0,0 +1,177 @@
+import heapq
+
+from django.conf import settings
+from django.db import connection
+
+from .models import CelebrityAuthor, Follow, Post, TimelineEntry, UserStats
+from .pagination import CursorPaginator, reverse_ordering, seek_filter
+
+BATCH_SIZE = 1000
+POST_ORDERING = ('-pub_date', '-pk')
+
+
+def is_celebrity(author_id: int) -> bool:
+    return CelebrityAuthor.objects.filter(author=author_id).exists()
+
+
+def classify(author_id: int) -> None:
+    """Отметить автора как популярного, если подписчиков стало слишком много.
+
+    Обратный перевод делает только `reclassify`, чтобы автор на границе
+    порога не перекладывался из одного режима в другой при каждой подписке.
+    """
+    popular = UserStats.objects.filter(
+        user=author_id,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+    )
+    if popular.exists():
+        CelebrityAuthor.objects.get_or_create(author_id=author_id)
+
+
+def reclassify() -> tuple[set[int], set[int]]:
+    """Пересчитать популярных авторов по текущему порогу.
+
+    Возвращает множества повышенных и пониженных авторов.
+    """
+    popular = set(
+        UserStats.objects.filter(
+            followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS
+        ).values_list('user', flat=True)
+    )
+    current = set(CelebrityAuthor.objects.values_list('author', flat=True))
+    promoted, demoted = popular - current, current - popular
+
+    CelebrityAuthor.objects.bulk_create(
+        CelebrityAuthor(author_id=author_id) for author_id in promoted
+    )
+    TimelineEntry.objects.filter(post__author__in=promoted).delete()
+    CelebrityAuthor.objects.filter(author__in=demoted).delete()
+    for follow in Follow.objects.filter(author__in=demoted).iterator():
+        backfill(follow)
+    return promoted, demoted
+
+
+def fan_out(post: Post) -> None:
+    """Разложить новый пост по лентам всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(author=post.author_id).values_list(
+        'user', flat=True
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow: Follow) -> None:
+    """Добавить в ленту подписчика уже опубликованные посты автора."""
+    if is_celebrity(follow.author_id):
+        return
+    posts = Post.objects.filter(author=follow.author_id).values_list(
+        'pk', 'pub_date'
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=follow.user_id, post_id=pk, pub_date=date)
+            for pk, date in posts.iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def rebuild() -> int:
+    """Заново разложить все посты по лентам подписчиков.
+
+    Нужна после массовой загрузки в обход сигналов. Популярные авторы
+    пересчитываются заранее, их посты в ленты не попадают. Возвращает
+    число записей в лентах.
+    """
+    reclassify()
+    TimelineEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} AS follow '
+            f'JOIN {Post._meta.db_table} AS post '
+            'ON post.author_id = follow.author_id '
+            'WHERE follow.author_id NOT IN '
+            f'(SELECT author_id FROM {CelebrityAuthor._meta.db_table})'
+        )
+        return cursor.rowcount
+
+
+def trim(follow: Follow) -> None:
+    """Убрать из ленты подписчика посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(
+        user=follow.user_id, post__author=follow.author_id
+    ).delete()
+
+
+def _celebrities(user):
+    return CelebrityAuthor.objects.filter(
+        author__following__user=user
+    ).values_list('author', flat=True)
+
+
+def followed_celebrities(user) -> list[int]:
+    return list(_celebrities(user))
+
+
+async def afollowed_celebrities(user) -> list[int]:
+    return [author async for author in _celebrities(user)]
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорный пагинатор ленты подписок, отдающий сами посты.
+
+    Посты обычных авторов читаются из материализованной ленты,
+    посты популярных авторов — по одному запросу на автора;
+    все потоки сливаются по `(pub_date, id)`.
+    """
+
+    def __init__(self, object_list, per_page, celebrities=(), count=None):
+        super().__init__(
+            object_list,
+            per_page,
+            ordering=('-pub_date', '-post_id'),
+            count=count,
+        )
+        self.celebrities = celebrities
+
+    def fetch(self, values, *, reverse: bool) -> list:
+        entries = super().fetch(values, reverse=reverse)
+        streams = [[entry.post for entry in entries]]
+        ordering = (
+            reverse_ordering(POST_ORDERING) if reverse else POST_ORDERING
+        )
+        for author_id in self.celebrities:
+            posts = (
+                Post.objects
+                .filter(author=author_id)
+                .select_related('group', 'author')
+                .order_by(*ordering)
+            )
+            if values is not None:
+                posts = posts.filter(seek_filter(ordering, values))
+            streams.append(list(posts[: self.per_page + 1]))
+
+        rows = []
+        # Posts pushed before their author became popular show up in two
+        # streams; equal keys are adjacent after the merge
+        for post in heapq.merge(*streams, key=self.key, reverse=not reverse):
+            if not rows or rows[-1].pk != post.pk:
+                rows.append(post)
+            if len(rows) > self.per_page:
+                break
+        return rows
+
+    def key(self, obj) -> list:  # noqa: PLR6301
+        return [obj.pub_date, obj.pk]
@@ -0,0 +1,345 @@
+import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from .bulk import BATCH_SIZE, explicit_dates, last_id, rebuild_derived
+from .models import Comment, Follow, Group, Post, User
+
+# File name → model and its columns. Relations are written by a natural key
+# where there is one, so content moves between databases with other users
+TABLES = {
+    'groups': (
+        Group,
+        {
+            'id': 'id',
+            'title': 'title',
+            'slug': 'slug',
+            'description': 'description',
+        },
+    ),
+    'posts': (
+        Post,
+        {
+            'id': 'id',
+            'text': 'text',
+            'pub_date': 'pub_date',
+            'author': 'author__username',
+            'group': 'group__slug',
+            'image': 'image',
+        },
+    ),
+    'comments': (
+        Comment,
+        {
+            'id': 'id',
+            'post': 'post_id',
+            'author': 'author__username',
+            'text': 'text',
+            'created': 'created',
+        },
+    ),
+    'follows': (
+        Follow,
+        {
+            'id': 'id',
+            'user': 'user__username',
+            'author': 'author__username',
+        },
+    ),
+}
+FORMATS = ('jsonl', 'csv')
+PROGRESS = '.progress.json'
+
+
+def load_progress(directory: Path) -> dict:
+    path = directory / PROGRESS
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_progress(directory: Path, progress: dict) -> None:
+    # Replaced in one step, so a crash never leaves half a file
+    temporary = directory / f'{PROGRESS}.tmp'
+    temporary.write_text(json.dumps(progress, indent=2))
+    temporary.replace(directory / PROGRESS)
+
+
+def _plain(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _encode(
+    rows: list, columns: list, file_format: str, *, header: bool
+) -> bytes:
+    if file_format == 'jsonl':
+        return ''.join(
+            json.dumps(
+                dict(zip(columns, map(_plain, row))), ensure_ascii=False
+            )
+            + '\n'
+            for row in rows
+        ).encode()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(
+        ['' if value is None else _plain(value) for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+def export(
+    directory: Path,
+    *,
+    file_format: str = 'jsonl',
+    resume: bool = False,
+    batch_size: int = BATCH_SIZE,
+    progress=None,
+) -> dict:
+    """Выгрузить группы, посты, комментарии и подписки в `directory`.
+
+    Каждая таблица пишется в свой файл `<имя>.<file_format>`
+    по возрастанию id, строки читаются через `iterator()` пачками
+    по `batch_size`, так что память не зависит от объёма данных. После
+    каждой пачки в `.progress.json` запоминаются последний id и длина
+    файла: с `resume=True` выгрузка продолжается с места остановки.
+    Возвращает число выгруженных строк по таблицам.
+    """
+    report = progress or (lambda _: None)
+    directory.mkdir(parents=True, exist_ok=True)
+    state = load_progress(directory).get('export') if resume else None
+    if state and state['format'] != file_format:
+        msg = (
+            f'Начатая выгрузка идёт в формате {state["format"]}, '
+            f'не {file_format}'
+        )
+        raise ValueError(msg)
+    state = state or {'format': file_format, 'tables': {}}
+    exported = {}
+    for name, (model, columns) in TABLES.items():
+        done = state['tables'].get(name, {'pk': 0, 'position': 0})
+        path = directory / f'{name}.{file_format}'
+        rows = (
+            model.objects
+            .filter(pk__gt=done['pk'])
+            .order_by('pk')
+            .values_list(*columns.values())
+            .iterator(chunk_size=batch_size)
+        )
+        exported[name] = 0
+        with path.open('r+b' if done['position'] else 'wb') as file:
+            # Rows written after the last saved position were not
+            # recorded, they are exported again
+            file.truncate(done['position'])
+            file.seek(done['position'])
+            while batch := list(islice(rows, batch_size)):
+                file.write(
+                    _encode(
+                        batch,
+                        list(columns),
+                        file_format,
+                        header=not file.tell(),
+                    )
+                )
+                file.flush()
+                done = {'pk': batch[-1][0], 'position': file.tell()}
+                state['tables'][name] = done
+                save_progress(directory, {'export': state})
+                exported[name] += len(batch)
+            if not file.tell():
+                file.write(
+                    _encode([], list(columns), file_format, header=True)
+                )
+        report(f'{name}: {exported[name]}')
+    return exported
+
+
+class _Lines:
+    """Строки бинарного файла с позицией конца последней прочитанной."""
+
+    def __init__(self, file):
+        self.file = file
+        self.position = file.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.file.readline()
+        if not line:
+            raise StopIteration
+        self.position += len(line)
+        return line.decode()
+
+    def seek(self, position: int) -> None:
+        self.file.seek(position)
+        self.position = position
+
+
+def _records(lines: _Lines, file_format: str, start: int):
+    if file_format == 'jsonl':
+        lines.seek(start)
+        return (json.loads(line) for line in lines if line.strip())
+    reader = csv.reader(lines)
+    columns = next(reader, [])
+    if start:
+        lines.seek(start)
+    return (dict(zip(columns, row)) for row in reader)
+
+
+def _resolve(model, name: str, lookup: str, records: list) -> int:
+    """Заменить натуральные ключи связи `name` на id.
+
+    Недостающие пользователи заводятся без пароля. Записи, чья
+    обязательная связь не нашлась, удаляются из `records`;
+    возвращает их число.
+    """
+    field = model._meta.get_field(name)
+    key = lookup.partition('__')[2] or 'pk'
+    related = field.related_model
+    values = {record[name] for record in records if record[name]}
+    ids = dict(
+        related.objects.filter(**{f'{key}__in': values}).values_list(key, 'pk')
+    )
+    # CSV gives strings for every column
+    values = {str(value) for value in values}
+    ids = {str(value): pk for value, pk in ids.items()}
+    if related is User and values - ids.keys():
+        password = make_password(None)
+        User.objects.bulk_create(
+            User(username=username, password=password)
+            for username in values - ids.keys()
+        )
+        ids.update(
+            User.objects.filter(username__in=values).values_list(
+                'username', 'pk'
+            )
+        )
+    kept = []
+    for record in records:
+        value = record.pop(name)
+        pk = ids.get(str(value)) if value not in {None, ''} else None
+        if pk is None and not field.null:
+            continue
+        record[field.attname] = pk
+        kept.append(record)
+    skipped = len(records) - len(kept)
+    records[:] = kept
+    return skipped
+
+
+def _shift(model, columns: dict, records: list, offsets: dict) -> None:
+    """Сдвинуть id записей и их ссылки по id на смещения таблиц."""
+    tables = {model: name for name, (model, _) in TABLES.items()}
+    shifts = {'id': offsets[tables[model]]}
+    for name, lookup in columns.items():
+        field = model._meta.get_field(name)
+        if field.is_relation and lookup == field.attname:
+            shifts[name] = offsets[tables[field.related_model]]
+    for record in records:
+        for name, shift in shifts.items():
+            if record[name] not in {None, ''}:
+                record[name] = int(record[name]) + shift
+
+
+def _instances(model, columns: dict, records: list) -> tuple[list, int]:
+    skipped = 0
+    for name, lookup in columns.items():
+        if model._meta.get_field(name).is_relation:
+            skipped += _resolve(model, name, lookup, records)
+    instances = []
+    for record in records:
+        values = {}
+        for name, value in record.items():
+            field = model._meta.get_field(name)
+            # CSV has no NULL, it is written as an empty string
+            if field.null and isinstance(value, str) and not value:
+                values[field.attname] = None
+            else:
+                values[field.attname] = field.to_python(value)
+        instances.append(model(**values))
+    return instances, skipped
+
+
+def import_(
+    directory: Path,
+    *,
+    resume: bool = False,
+    batch_size: int = BATCH_SIZE,
+    progress=None,
+) -> dict:
+    """Загрузить файлы, выгруженные `export`, из `directory`.
+
+    Строки читаются потоком и вставляются через `bulk_create` пачками
+    по `batch_size`, каждая пачка в своей транзакции; после неё
+    в `.progress.json` запоминается позиция в файле, и с `resume=True`
+    загрузка продолжается с неё. В пустую базу строки попадают с теми
+    же id; если записи уже есть, id загружаемых сдвигаются за наибольший
+    имеющийся, вместе со ссылками комментариев на посты. Сообщества
+    с занятым slug и повторяющиеся подписки пропускаются. Авторы,
+    которых нет в базе, заводятся без пароля. Счётчики, ленты
+    и поисковый индекс пересчитываются в конце. Возвращает число
+    прочитанных строк по таблицам.
+    """
+    report = progress or (lambda _: None)
+    saved = load_progress(directory)
+    state = saved.get('import') if resume else None
+    if not state:
+        # Saved before the first row goes in: a resumed import must shift
+        # by the same offsets, not past the rows it has itself inserted
+        state = {
+            'offsets': {
+                name: last_id(model) for name, (model, _) in TABLES.items()
+            },
+            'files': {},
+        }
+        save_progress(directory, {**saved, 'import': state})
+    imported = {}
+    for name, (model, columns) in TABLES.items():
+        paths = [
+            directory / f'{name}.{file_format}'
+            for file_format in FORMATS
+            if (directory / f'{name}.{file_format}').exists()
+        ]
+        if not paths:
+            continue
+        path = paths[0]
+        done = state['files'].get(
+            path.name, {'position': 0, 'rows': 0, 'skipped': 0}
+        )
+        with path.open('rb') as file:
+            lines = _Lines(file)
+            records = _records(lines, path.suffix[1:], done['position'])
+            while batch := list(islice(records, batch_size)):
+                read = len(batch)
+                _shift(model, columns, batch, state['offsets'])
+                with transaction.atomic(), explicit_dates():
+                    instances, skipped = _instances(model, columns, batch)
+                    model.objects.bulk_create(instances, ignore_conflicts=True)
+                done = {
+                    'position': lines.position,
+                    'rows': done['rows'] + read,
+                    'skipped': done['skipped'] + skipped,
+                }
+                state['files'][path.name] = done
+                save_progress(directory, {**saved, 'import': state})
+        imported[name] = done['rows']
+        report(f'{name}: {done["rows"]}, без связей {done["skipped"]}')
+
+    # Explicit ids do not move sequences on backends that have them
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [model for model, _ in TABLES.values()]
+        ):
+            cursor.execute(sql)
+    rebuild_derived(report)
+    return imported
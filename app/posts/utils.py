@@ -1,11 +1,52 @@
 from django.conf import settings
-from django.core.paginator import Page, Paginator
+from django.core.paginator import Page
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
 
+from .models import Post
+from .pagination import CursorPaginator
 
-def paginate(request: HttpRequest, posts: QuerySet) -> Page:
+
+async def auser(request: HttpRequest):
+    """Загрузить пользователя запроса в async view один раз.
+
+    `request.auser()` и ленивый `request.user`, которым пользуются
+    шаблоны, кэшируют пользователя порознь; загруженный здесь
+    подставляется в оба.
+    """
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+def paginate(
+    request: HttpRequest,
+    posts: QuerySet,
+    paginator_class: type[CursorPaginator] = CursorPaginator,
+    **kwargs,
+) -> Page:
     """Разбить набор постов на страницы и вернуть запрашиваемую страницу."""
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    paginator = paginator_class(posts, settings.POSTS_PER_PAGE, **kwargs)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def paginate_lazily(request: HttpRequest, posts: QuerySet, **kwargs) -> Page:
+    """То же, что `paginate`, но страница загружается при первом обращении.
+
+    Если лента целиком отдана из кэша фрагментов, запроса к базе не будет.
+    """
+    return SimpleLazyObject(  # type: ignore
+        lambda: paginate(request, posts, **kwargs)
+    )
+
+
+def paginate_comments(request: HttpRequest, post: Post) -> Page:
+    """Вернуть запрашиваемую страницу комментариев поста, от старых к новым."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),  # type: ignore
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'pk'),
+        count=post.comments_count,
+    )
+    return paginator.get_page(request.GET.get('cursor'))
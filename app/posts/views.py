@@ -1,51 +1,171 @@
+# ruff: noqa: ARG001, ARG005
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import HttpRequest
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import (
+    aget_object_or_404,
+    get_object_or_404,
+    redirect,
+    render,
+)
+
+from core.replicas import replica_reads
 
+from . import caching
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import paginate
+from .search import SearchPaginator
+from .timeline import TimelinePaginator, afollowed_celebrities
+from .utils import auser, paginate, paginate_comments, paginate_lazily
+
+
+async def render_feed(
+    request: HttpRequest, template_name: str, context: dict, *scopes, **loaders
+):
+    """Отрисовать страницу асинхронного view.
+
+    Шаблон обращается к базе (ленты загружаются, только если их
+    фрагмента нет в кэше), поэтому он вместе с поколениями `scopes`
+    и переменными из функций `loaders` обрабатывается за один переход
+    в поток, где доступен ORM.
+    """
 
+    def render_in_thread():
+        loaded = {name: load() for name, load in loaders.items()}
+        feed = caching.feed_context(*scopes) if scopes else {}
+        return render(request, template_name, {**context, **loaded, **feed})
 
-def index(request: HttpRequest):
+    return await sync_to_async(render_in_thread)()
+
+
+@replica_reads
+@caching.conditional(lambda request: [caching.INDEX])
+async def index(request: HttpRequest):
     posts = Post.objects.select_related('group', 'author')
-    context = {'page_obj': paginate(request, posts)}
-    return render(request, 'posts/index.html', context)
+    context = {'page_obj': paginate_lazily(request, posts)}
+    return await render_feed(
+        request, 'posts/index.html', context, caching.INDEX
+    )
 
 
-def group_posts(request: HttpRequest, slug: str):
-    group = get_object_or_404(Group, slug=slug)
+def group_scopes(request: HttpRequest, slug: str) -> list | None:
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    )
+    return group_id and [caching.group_scope(group_id)]
+
+
+@replica_reads
+@caching.conditional(group_scopes)
+async def group_posts(request: HttpRequest, slug: str):
+    group = await aget_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author')  # type: ignore
-    context = {
-        'group': group,
-        'page_obj': paginate(request, posts),
-    }
-    return render(request, 'posts/group_list.html', context)
+    context = {'group': group, 'page_obj': paginate_lazily(request, posts)}
+    return await render_feed(
+        request,
+        'posts/group_list.html',
+        context,
+        caching.group_scope(group.pk),
+    )
 
 
-def profile(request: HttpRequest, username: str):
-    author = get_object_or_404(User, username=username)
+def profile_scopes(request: HttpRequest, username: str) -> list | None:
+    author_id = (
+        User.objects
+        .filter(username=username)
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if author_id is None:
+        return None
+    scopes = [
+        caching.author_scope(author_id),
+        caching.profile_scope(author_id),
+    ]
+    if request.user.is_authenticated:
+        # The follow button depends on the viewer's subscriptions
+        scopes.append(caching.follow_scope(request.user.pk))
+    return scopes
+
+
+@replica_reads
+@caching.conditional(profile_scopes)
+async def profile(request: HttpRequest, username: str):
+    author = await aget_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     posts = author.posts.select_related('group')  # type: ignore
+    user = await auser(request)
     following = (
-        request.user.is_authenticated
-        and author.following.filter(user=request.user).exists()  # type: ignore
+        user.is_authenticated
+        and await author.following.filter(user=user).aexists()  # type: ignore
     )
+    stats = getattr(author, 'stats', None)
     context = {
         'author': author,
-        'page_obj': paginate(request, posts),
+        'page_obj': paginate_lazily(
+            request, posts, count=stats and stats.posts_count
+        ),
         'following': following,
     }
-    return render(request, 'posts/profile.html', context)
+    return await render_feed(
+        request,
+        'posts/profile.html',
+        context,
+        caching.author_scope(author.pk),
+    )
 
 
-def post_detail(request: HttpRequest, post_id: int):
-    post = get_object_or_404(Post, pk=post_id)
+def post_scopes(request: HttpRequest, post_id: int) -> list | None:
+    author_id = (
+        Post.objects
+        .filter(pk=post_id)
+        .values_list('author', flat=True)
+        .first()
+    )
+    # The sidebar shows how many posts the author has
+    return author_id and [
+        caching.post_scope(post_id),
+        caching.author_scope(author_id),
+    ]
+
+
+@replica_reads
+@caching.conditional(post_scopes)
+async def post_detail(request: HttpRequest, post_id: int):
+    post = await aget_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    return await render_feed(
+        request,
+        'posts/post_detail.html',
+        {'post': post, 'form': CommentForm()},
+        comments=lambda: paginate_comments(request, post),
+    )
+
+
+@replica_reads
+def post_comments(request: HttpRequest, post_id: int):
+    post = get_object_or_404(
+        Post.objects.only('pk', 'comments_count'), pk=post_id
+    )
     context = {
         'post': post,
-        'comments': post.comments.all(),  # type: ignore
-        'form': CommentForm(),
+        'comments': paginate_comments(request, post),
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request: HttpRequest):
+    query = request.GET.get('q', '').strip()
+    posts = Post.objects.select_related('group', 'author')
+    context = {
+        'query': query,
+        'page_obj': paginate(request, posts, SearchPaginator, query=query),
+    }
+    return render(request, 'posts/search.html', context)
 
 
 @login_required
@@ -59,7 +179,9 @@ def post_create(request: HttpRequest):
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
 
-    form.save()
+    # Only the write takes the database lock, not the form page
+    with transaction.atomic():
+        form.save()
     return redirect(
         'posts:profile',
         username=request.user.username,  # type: ignore
@@ -82,7 +204,9 @@ def post_edit(request: HttpRequest, post_id: int):
             request, 'posts/create_post.html', {'form': form, 'is_edit': True}
         )
 
-    form.save()
+    # Counters and feeds are updated by signals in the same transaction
+    with transaction.atomic():
+        form.save()
     return redirect(post)
 
 
@@ -92,7 +216,8 @@ def post_delete(request: HttpRequest, post_id: int):
     if request.user != post.author:
         return redirect(post)
     if request.method == 'POST':
-        post.delete()
+        with transaction.atomic():
+            post.delete()
         return redirect(
             'posts:profile',
             username=request.user.username,  # type: ignore
@@ -108,22 +233,31 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect(post)
 
 
 @login_required
-def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('group', 'author')
-    context = {
-        'page_obj': paginate(request, posts),
-    }
-    return render(request, 'posts/follow.html', context)
+@replica_reads
+async def follow_index(request):
+    user = await auser(request)
+    entries = user.timeline.select_related('post__group', 'post__author')
+    celebrities = await afollowed_celebrities(user)
+    return await render_feed(
+        request,
+        'posts/follow.html',
+        {},
+        caching.follow_scope(user.pk),
+        *map(caching.author_scope, celebrities),
+        page_obj=lambda: paginate(
+            request, entries, TimelinePaginator, celebrities=celebrities
+        ),
+    )
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -132,6 +266,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     subscription = author.following.filter(user=request.user)  # type: ignore
@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from core import testing
+
+
+class UsersQueryBudgetTests(testing.QueryBudgetMixin, TestCase):
+    def requests(self) -> dict:
+        client = self.client_for(self.most_active_user())
+        get = self.client.get
+        return {
+            'signup': (0, lambda: get(reverse('users:signup'))),
+            'login': (0, lambda: get(reverse('users:login'))),
+            'password_change': (
+                2,
+                lambda: client.get(reverse('users:password_change')),
+            ),
+            'password_change_done': (
+                2,
+                lambda: client.get(reverse('users:password_change_done')),
+            ),
+            'password_reset': (
+                0,
+                lambda: get(reverse('users:password_reset')),
+            ),
+            'password_reset_done': (
+                0,
+                lambda: get(reverse('users:password_reset_done')),
+            ),
+            'password_reset_confirm': (
+                1,
+                lambda: get(
+                    reverse(
+                        'users:password_reset_confirm',
+                        kwargs={'uidb64': 'MQ', 'token': 'set-password'},
+                    )
+                ),
+            ),
+            'password_reset_complete': (
+                0,
+                lambda: get(reverse('users:password_reset_complete')),
+            ),
+            'logout': (4, lambda: client.post(reverse('users:logout'))),
+        }
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_asgi_application()
+
+from posts.thumbnails import warm_up_on_start  # noqa: E402
+
+warm_up_on_start()
@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,11 +50,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    # Outermost, so it sees the connection opened for the session too
+    'core.instrumentation.ConnectionTimingMiddleware',
+    'core.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,7 +68,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = BASE_DIR / 'templates'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates that report render time to request metrics
+        'BACKEND': 'core.instrumentation.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,17 +85,45 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Feeds and post pages are async views: under ASGI a process serves many
+# slow clients at once instead of one per thread
+ASGI_APPLICATION = 'yatube.asgi.application'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# LocMemCache is private to each worker process: with several workers
+# every one of them renders and stores its own copy of each fragment.
+# The SQLite-backed cache is shared by all processes on the host
+SHARED_CACHE = False
+
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': BASE_DIR / 'cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10_000,
+                'MAX_SIZE': 64 * 1024 * 1024,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
+
+# Feed fragments are invalidated by generation bumps on writes, which
+# live in the default cache: only a shared cache carries a bump to every
+# worker process, a private one keeps the short lifetime of the original
+# page cache
+FEED_CACHE_TIMEOUT = 60 * 60 * 6 if SHARED_CACHE else 20
+# Rendered post cards are keyed by their content and never go stale
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
 
 
 # Database
@@ -102,6 +136,45 @@ DATABASES = {
     }
 }
 
+# Tuned for several worker processes: WAL journal, per-connection pragmas,
+# write transactions that take the write lock upfront and retries
+# when the database is busy. See core/sqlite/base.py
+SQLITE_TUNED = True
+
+if SQLITE_TUNED:
+    DATABASES['default'].update({
+        'ENGINE': 'core.sqlite',
+        'OPTIONS': {
+            'pragmas': {
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'cache_size': -32_000,
+                'mmap_size': 128 * 1024 * 1024,
+            },
+            'write_retries': 5,
+            'pool_size': 4,
+        },
+    })
+
+# Connections are kept open between requests of the same thread and checked
+# before reuse. Servers that start a thread per request (runserver) close
+# them at the end of each one; core.sqlite then keeps them in a pool
+DATABASES['default'].update({'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True})
+
+# Read-only feed views read from copies of the default database listed
+# here (locally: SQLite files refreshed by `manage.py sync_replicas`);
+# a browser that has just written reads from default for a while
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -143,6 +216,23 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded post images are shrunk to fit this many pixels per side
+# and re-encoded without metadata; larger uploads are rejected
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+# Thumbnails are made by background threads, never inside a request;
+# until one is ready the original image is shown. 0 makes them inline
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+# Tests make them inline: worker threads would contend for the table
+# locks of the shared-cache in-memory test database
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+# Thumbnail metadata of this many recent posts is loaded into the cache
+# when an application server starts
+THUMBNAIL_WARM_UP_POSTS = 200
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -153,6 +243,30 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Display settings
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+GROUPS_PER_PAGE = 50
+
+
+# Timelines
+
+# Posts of authors with at least this many followers are not pushed into
+# followers' timelines on write, they are merged into the feed on read
+TIMELINE_CELEBRITY_FOLLOWERS = 1000
+
+
+# Request metrics
+
+# Views of these URL namespaces are measured: queries, time in the database,
+# template rendering and total; percentiles are at /internal/metrics/
+REQUEST_METRICS_NAMESPACES = ['posts', 'api']
+REQUEST_METRICS_SAMPLES = 1000
+# Requests over any of these are logged as warnings
+REQUEST_BUDGETS = {
+    'queries': 20,
+    'db_ms': 50,
+    'template_ms': 100,
+    'total_ms': 300,
+}
 
 
 # URLs
@@ -3,12 +3,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import request_metrics
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('api/', include('posts.api_urls', namespace='api')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('internal/metrics/', request_metrics, name='request_metrics'),
 ]
 
 handler403 = 'core.views.permission_denied'